@@ -3,43 +3,85 @@ Author: Migbert Yanez
 GitHub: https://github.com/migbertweb
 License: GPL-3.0
 Description: Utilidades de autenticación que incluyen hash y verificación de contraseñas, y creación y manejo de tokens JWT.
+passlib/bcrypt y el anillo de claves se cargan en el primer uso (o en el calentamiento del arranque).
 """
+import functools
+import hashlib
+import secrets
+import uuid
 from datetime import datetime, timedelta
 from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
 
 from .database import settings
+from .keys import get_keyring
 
-# Clave secreta para codificar y decodificar las cadenas JWT.
-SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = settings.ALGORITHM
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+class InvalidRefreshTokenError(ValueError):
+    """
+    Token de refresco inexistente, expirado, revocado o ya usado.
+    """
+
+@functools.lru_cache(maxsize=None)
+def password_context():
+    """
+    Contexto de passlib para bcrypt, creado en el primer uso.
+    """
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def verify_password(plain_password, hashed_password):
     """
     Verifica si una contraseña en texto plano coincide con su hash.
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password):
     """
     Genera un hash seguro para una contraseña.
     """
-    return pwd_context.hash(password)
+    return password_context().hash(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """
-    Crea un token de acceso JWT con un tiempo de expiración.
+    Crea un token de acceso JWT con un tiempo de expiración, firmado con la clave activa del anillo.
+    Cada token lleva un `jti` único para poder revocarlo.
     """
     to_encode = data.copy()
+    to_encode.setdefault("jti", uuid.uuid4().hex)
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+    return get_keyring().encode(to_encode)
+
+
+def token_session(payload: dict) -> tuple:
+    """
+    Identificadores revocables de un token de acceso: su `jti` y el `sid` de su sesión.
+    Los tokens emitidos antes de existir estos claims no llevan ninguno.
+    """
+    return tuple(identifier for identifier in (payload.get("jti"), payload.get("sid")) if identifier)
 
+def new_refresh_token() -> str:
+    """
+    Token de refresco opaco y aleatorio (256 bits).
+    """
+    return secrets.token_urlsafe(32)
+
+def hash_refresh_token(token: str) -> str:
+    """
+    Hash con el que se guarda y se busca un token de refresco. Al ser aleatorio y largo,
+    SHA-256 basta (bcrypt solo protege secretos de baja entropía como las contraseñas).
+    """
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def warm_up():
+    """
+    Carga por adelantado el anillo de claves y el contexto de bcrypt (se llama en segundo plano al arrancar).
+    """
+    get_keyring()
+    password_context()
@@ -0,0 +1,342 @@
+"""
+Author: Migbert Yanez
+GitHub: https://github.com/migbertweb
+License: GPL-3.0
+Description: Cachés de la aplicación: un caché LRU con expiración (TTL) genérico, el caché de tokens verificados
+usado por la autenticación y el caché de lectura de tareas (en memoria o en Redis) con invalidación por escritura.
+"""
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+from .database import settings
+
+class TTLCache:
+    """
+    Caché LRU acotado por tamaño en el que cada entrada expira tras su TTL.
+    Lleva contadores de aciertos y fallos para monitorización.
+    """
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Any, tuple[float, Any]]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        """
+        Devuelve el valor cacheado o `default` si no existe o ha expirado.
+        """
+        item = self._data.get(key)
+        if item is not None:
+            expires_at, value = item
+            if expires_at > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._data[key]
+        self.misses += 1
+        return default
+
+    def set(self, key, value, ttl: Optional[float] = None):
+        """
+        Guarda un valor. El TTL efectivo es el menor entre el del caché y el indicado.
+        """
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        """
+        Elimina una entrada y devuelve su valor.
+        """
+        item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self) -> dict:
+        """
+        Métricas del caché: tamaño, aciertos, fallos y tasa de aciertos.
+        """
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+class TokenCache(TTLCache):
+    """
+    Caché de tokens JWT ya verificados -> identidad mínima del usuario (schemas.Principal)
+    y los identificadores de revocación del token (`jti`, `sid`).
+    Cada entrada vive como máximo hasta la expiración (`exp`) del propio token.
+    """
+    def set_token(self, token: str, principal, exp: Optional[float] = None, session: tuple = ()):
+        ttl = None if exp is None else exp - time.time()
+        self.set(token, (principal, session), ttl=ttl)
+
+    def invalidate_user(self, user_id: int) -> int:
+        """
+        Elimina todos los tokens cacheados de un usuario (p. ej. al desactivarlo).
+        Devuelve el número de entradas eliminadas.
+        """
+        stale = [key for key, (_, (principal, _session)) in self._data.items() if principal.id == user_id]
+        for key in stale:
+            del self._data[key]
+        return len(stale)
+
+token_cache = TokenCache(maxsize=settings.TOKEN_CACHE_SIZE, ttl=settings.TOKEN_CACHE_TTL)
+
+class MemoryBackend:
+    """
+    Backend en memoria del proceso sobre TTLCache. Guarda los objetos tal cual, sin serializar.
+    Las generaciones van aparte para que la expulsión LRU no las reinicie.
+    """
+    serializes = False
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._generations: dict[str, int] = {}
+
+    async def get(self, key: str):
+        return self.cache.get(key)
+
+    async def set(self, key: str, value, ttl: float):
+        self.cache.set(key, value, ttl=ttl)
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self.cache.pop(key)
+
+    async def generation(self, key: str) -> int:
+        return self._generations.get(key, 0)
+
+    async def bump(self, key: str) -> int:
+        self._generations[key] = self._generations.get(key, 0) + 1
+        return self._generations[key]
+
+    def clear(self):
+        self.cache.clear()
+        self._generations.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self.cache), "maxsize": self.cache.maxsize}
+
+class RedisBackend:
+    """
+    Backend compartido entre workers y réplicas sobre Redis (requiere el paquete `redis`).
+    Los valores se guardan serializados en JSON.
+    """
+    serializes = True
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url)
+
+    async def get(self, key: str):
+        return await self.client.get(key)
+
+    async def set(self, key: str, value, ttl: float):
+        await self.client.set(key, value, ex=max(math.ceil(ttl), 1))
+
+    async def delete(self, *keys: str):
+        if keys:
+            await self.client.delete(*keys)
+
+    async def generation(self, key: str) -> int:
+        value = await self.client.get(key)
+        return int(value) if value is not None else 0
+
+    async def bump(self, key: str) -> int:
+        return await self.client.incr(key)
+
+    def clear(self):
+        pass
+
+    def stats(self) -> dict:
+        return {}
+
+class _RawJSON:
+    """
+    Adaptador identidad para valores que ya son JSON serializado (bytes).
+    """
+    @staticmethod
+    def validate_json(value):
+        return value
+
+    @staticmethod
+    def dump_json(value):
+        return value
+
+RAW_JSON = _RawJSON()
+
+def build_backend(url: str, maxsize: int, ttl: float):
+    """
+    Crea el backend del caché a partir de su URL (memory:// o redis://).
+    """
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    if url.startswith("memory://"):
+        return MemoryBackend(maxsize=maxsize, ttl=ttl)
+    raise ValueError(f"Backend de caché no soportado: {url}")
+
+class SingleFlight:
+    """
+    Agrupa las cargas concurrentes de una misma clave: la primera ejecuta la carga y
+    las demás esperan su resultado (evita la estampida de consultas al expirar una entrada).
+    """
+    def __init__(self):
+        self.shared = 0
+        self._calls: dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, loader: Callable[[], Awaitable[Any]]):
+        future = self._calls.get(key)
+        if future is not None:
+            self.shared += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # Si se canceló la carga original (y no esta espera), se carga de nuevo
+                if not future.cancelled():
+                    raise
+                return await loader()
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Marca la excepción como recuperada aunque nadie más esperase
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+class ReadThroughCache:
+    """
+    Caché de lectura por propietario con invalidación por escritura.
+
+    Los listados se guardan bajo la generación actual del propietario, que cada escritura aumenta:
+    así se invalidan todos sus listados de una vez sin recorrer claves. Las entradas de una tarea
+    se borran por clave, y solo se guardan si la generación no cambió durante la carga (una lectura
+    que compite con una escritura no deja en el caché datos anteriores al commit).
+    """
+    def __init__(self, backend, ttl: float, prefix: str = "tasks"):
+        self.backend = backend
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self.single_flight = SingleFlight()
+
+    def _generation_key(self, owner_id: int) -> str:
+        return f"{self.prefix}:{owner_id}:gen"
+
+    def _item_key(self, owner_id: int, item_id) -> str:
+        return f"{self.prefix}:{owner_id}:item:{item_id}"
+
+    async def _get(self, key: str, adapter):
+        value = await self.backend.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return adapter.validate_json(value) if self.backend.serializes else value
+
+    async def _set(self, key: str, value, adapter):
+        if self.backend.serializes:
+            value = adapter.dump_json(value)
+        await self.backend.set(key, value, self.ttl)
+
+    async def get_item(self, owner_id: int, item_id, loader: Callable[[], Awaitable[Any]], adapter):
+        """
+        Devuelve un elemento del propietario, cargándolo con `loader` si no está en caché.
+        Los resultados None (no encontrado) no se cachean.
+        """
+        if self.ttl <= 0:
+            return await loader()
+        key = self._item_key(owner_id, item_id)
+        value = await self._get(key, adapter)
+        if value is not None:
+            return value
+
+        async def load():
+            generation = await self.backend.generation(self._generation_key(owner_id))
+            result = await loader()
+            if result is not None and await self.backend.generation(self._generation_key(owner_id)) == generation:
+                await self._set(key, result, adapter)
+            return result
+
+        return await self.single_flight.do(key, load)
+
+    async def get_list(self, owner_id: int, params: tuple, loader: Callable[[], Awaitable[Any]], adapter):
+        """
+        Devuelve un listado del propietario para los parámetros dados, cargándolo con `loader` si hace falta.
+        """
+        if self.ttl <= 0:
+            return await loader()
+        generation = await self.backend.generation(self._generation_key(owner_id))
+        key = f"{self.prefix}:{owner_id}:list:{generation}:" + ":".join(map(str, params))
+        value = await self._get(key, adapter)
+        if value is not None:
+            return value
+
+        async def load():
+            result = await loader()
+            await self._set(key, result, adapter)
+            return result
+
+        return await self.single_flight.do(key, load)
+
+    async def invalidate(self, owner_id: int, item_ids=()):
+        """
+        Invalida los listados del propietario y las entradas de los elementos indicados.
+        Debe llamarse después del commit de la escritura.
+        """
+        if self.ttl <= 0:
+            return
+        await self.backend.bump(self._generation_key(owner_id))
+        await self.backend.delete(*(self._item_key(owner_id, item_id) for item_id in item_ids))
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> dict:
+        """
+        Métricas del caché: aciertos, fallos, tasa de aciertos y cargas compartidas (single-flight).
+        """
+        total = self.hits + self.misses
+        stats = dict(self.backend.stats())
+        stats.update(
+            hits=self.hits,
+            misses=self.misses,
+            hit_ratio=round(self.hits / total, 4) if total else 0.0,
+            shared_loads=self.single_flight.shared,
+        )
+        return stats
+
+task_cache = ReadThroughCache(
+    build_backend(settings.TASK_CACHE_URL, maxsize=settings.TASK_CACHE_SIZE, ttl=settings.TASK_CACHE_TTL),
+    ttl=settings.TASK_CACHE_TTL,
+)
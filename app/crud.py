@@ -4,11 +4,23 @@ GitHub: https://github.com/migbertweb
 License: GPL-3.0
 Description: Funciones para operaciones Crear, Leer, Actualizar y Eliminar (CRUD) en la base de datos para Usuarios y Tareas.
 """
+from typing import Optional
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import Date, case, cast, delete, false, func, insert, literal_column, true, tuple_, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
-from . import models, schemas
-from .auth import get_password_hash
+import math
+import uuid
+
+from . import auth, models, schemas, search
+from .events import broker
+from .cache import RAW_JSON, task_cache, token_cache
+from .pagination import InvalidCursorError, decode_cursor, encode_cursor, parse_datetime, parse_id
+from .hashing import hash_password
+from .database import after_commit, commit, replicas, settings
+from .revocation import as_utc, denylist
 
 async def get_user(db: AsyncSession, user_id: int):
     """
@@ -19,21 +31,55 @@ async def get_user(db: AsyncSession, user_id: int):
 
 async def get_user_by_email(db: AsyncSession, email: str):
     """
-    Obtiene un usuario por su correo electrónico.
+    Obtiene un usuario por su correo electrónico (sin cargar sus tareas).
+    """
+    result = await db.execute(select(models.User).filter(models.User.email == email))
+    return result.scalars().first()
+
+async def get_user_with_tasks(db: AsyncSession, user_id: int):
+    """
+    Obtiene un usuario con todas sus tareas cargadas.
+    Usar solo donde se serializa `schemas.User` completo.
     """
-    result = await db.execute(select(models.User).options(selectinload(models.User.tasks)).filter(models.User.email == email))
+    result = await db.execute(select(models.User).options(selectinload(models.User.tasks)).filter(models.User.id == user_id))
     return result.scalars().first()
 
-async def create_user(db: AsyncSession, user: schemas.UserCreate):
+async def get_principal_by_email(db: AsyncSession, email: str):
+    """
+    Obtiene solo la identidad del usuario (id, email, is_active) mediante una proyección de columnas,
+    sin construir la entidad ORM ni cargar relaciones. Pensado para la autenticación.
+    """
+    result = await db.execute(
+        select(models.User.id, models.User.email, models.User.is_active).filter(models.User.email == email)
+    )
+    row = result.first()
+    return schemas.Principal.model_validate(row) if row else None
+
+async def get_user_credentials_by_email(db: AsyncSession, email: str):
+    """
+    Obtiene la identidad y el hash de contraseña de un usuario para el login.
+    Devuelve una fila (id, email, hashed_password, is_active) o None.
+    """
+    result = await db.execute(
+        select(models.User.id, models.User.email, models.User.hashed_password, models.User.is_active)
+        .filter(models.User.email == email)
+    )
+    return result.first()
+
+async def create_user(db: AsyncSession, user: schemas.UserCreate) -> Optional[schemas.User]:
     """
     Crea un nuevo usuario en la base de datos con contraseña hasheada.
+    Devuelve None si el email ya está registrado: lo detecta la restricción UNIQUE al insertar,
+    dentro de un SAVEPOINT que deja intacto el resto de la transacción (sin consulta previa).
     """
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await hash_password(user.password)
     db_user = models.User(email=user.email, hashed_password=hashed_password)
-    db.add(db_user)
-    await db.commit()
-    await db.refresh(db_user)
-    
+    try:
+        async with db.begin_nested():
+            db.add(db_user)
+    except IntegrityError:
+        return None
+
     # Manually construct the Pydantic model to avoid async lazy loading of 'tasks'
     return schemas.User(
         id=db_user.id,
@@ -42,19 +88,376 @@ async def create_user(db: AsyncSession, user: schemas.UserCreate):
         tasks=[]
     )
 
-async def get_task(db: AsyncSession, task_id: int):
+async def set_user_active(db: AsyncSession, user_id: int, is_active: bool):
+    """
+    Activa o desactiva un usuario e invalida sus tokens cacheados tras el commit.
+    """
+    db_user = await get_user(db, user_id)
+    if db_user:
+        db_user.is_active = is_active
+        await db.flush()
+        after_commit(db, lambda: token_cache.invalidate_user(user_id))
+    return db_user
+
+def _add_refresh_token(db: AsyncSession, user_id: int, family_id: str) -> str:
+    token = auth.new_refresh_token()
+    db.add(models.RefreshToken(
+        token_hash=auth.hash_refresh_token(token),
+        family_id=family_id,
+        user_id=user_id,
+        expires_at=datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    return token
+
+async def create_refresh_token(db: AsyncSession, user_id: int) -> tuple[str, str]:
+    """
+    Abre una sesión: crea el primer token de refresco de una familia nueva.
+    Devuelve (token, family_id); el family_id es el `sid` de los tokens de acceso de la sesión.
+    """
+    family_id = uuid.uuid4().hex
+    token = _add_refresh_token(db, user_id, family_id)
+    await db.flush()
+    return token, family_id
+
+async def rotate_refresh_token(db: AsyncSession, token: str) -> tuple[schemas.Principal, str, str]:
+    """
+    Canjea un token de refresco por otro nuevo de la misma familia, sin pasar por bcrypt.
+    Devuelve (usuario, nuevo token, family_id). Si el token ya se había usado o revocado
+    (posible robo) se revoca la sesión entera. Lanza InvalidRefreshTokenError si no es válido.
+    """
+    now = datetime.now(timezone.utc)
+    row = (await db.execute(
+        select(
+            models.RefreshToken.id,
+            models.RefreshToken.family_id,
+            models.RefreshToken.expires_at,
+            models.RefreshToken.used_at,
+            models.RefreshToken.revoked_at,
+            models.User.id.label("user_id"),
+            models.User.email,
+            models.User.is_active,
+        )
+        .join(models.User, models.User.id == models.RefreshToken.user_id)
+        .filter(models.RefreshToken.token_hash == auth.hash_refresh_token(token))
+    )).first()
+    if row is None:
+        raise auth.InvalidRefreshTokenError("Token de refresco inválido")
+    if row.used_at is None and row.revoked_at is None:
+        if as_utc(row.expires_at) <= now or not row.is_active:
+            raise auth.InvalidRefreshTokenError("Token de refresco expirado")
+        # Marca de uso atómica: de dos canjes concurrentes del mismo token solo gana uno
+        claimed = await db.execute(
+            update(models.RefreshToken)
+            .filter(
+                models.RefreshToken.id == row.id,
+                models.RefreshToken.used_at.is_(None),
+                models.RefreshToken.revoked_at.is_(None),
+            )
+            .values(used_at=now)
+        )
+        if claimed.rowcount:
+            new_token = _add_refresh_token(db, row.user_id, row.family_id)
+            await db.flush()
+            return schemas.Principal(id=row.user_id, email=row.email, is_active=row.is_active), new_token, row.family_id
+    # Reutilización de un token ya canjeado: se cierra la sesión completa. Se confirma aquí
+    # porque la petición termina en error y la unidad de trabajo desharía la revocación
+    await revoke_sessions(db, row.user_id, [row.family_id])
+    await commit(db)
+    raise auth.InvalidRefreshTokenError("Token de refresco reutilizado")
+
+async def _active_sessions(db: AsyncSession, user_id: int) -> list[str]:
+    result = await db.execute(
+        select(models.RefreshToken.family_id)
+        .filter(
+            models.RefreshToken.user_id == user_id,
+            models.RefreshToken.revoked_at.is_(None),
+            models.RefreshToken.expires_at > datetime.now(timezone.utc),
+        )
+        .distinct()
+    )
+    return list(result.scalars().all())
+
+async def revoke_sessions(db: AsyncSession, user_id: int, family_ids: list[str]):
+    """
+    Revoca sesiones del usuario: sus tokens de refresco y, vía la lista de revocación,
+    los tokens de acceso emitidos en ellas. No hace commit.
+    """
+    if not family_ids:
+        return
+    now = datetime.now(timezone.utc)
+    await db.execute(
+        update(models.RefreshToken)
+        .filter(
+            models.RefreshToken.user_id == user_id,
+            models.RefreshToken.family_id.in_(family_ids),
+            models.RefreshToken.revoked_at.is_(None),
+        )
+        .values(revoked_at=now)
+    )
+    # Los tokens de acceso de la sesión caducan como mucho en ACCESS_TOKEN_EXPIRE_MINUTES
+    await denylist.revoke(db, family_ids, now + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
+
+async def logout(db: AsyncSession, user_id: int, payload: dict, all_sessions: bool = False):
+    """
+    Cierra la sesión del token de acceso (o todas las del usuario): revoca el propio token
+    por su `jti`, su sesión `sid` y los tokens de refresco asociados.
+    """
+    jti, sid = payload.get("jti"), payload.get("sid")
+    if jti:
+        await denylist.revoke(db, [jti], datetime.fromtimestamp(payload["exp"], timezone.utc))
+    family_ids = {sid} if sid else set()
+    if all_sessions:
+        family_ids.update(await _active_sessions(db, user_id))
+    await revoke_sessions(db, user_id, sorted(family_ids))
+    await db.flush()
+
+async def get_tasks_revision(db: AsyncSession, owner_id: int) -> int:
     """
-    Obtiene una tarea por su ID.
+    Obtiene la revisión de la colección de tareas de un usuario (base del ETag del listado).
     """
-    result = await db.execute(select(models.Task).filter(models.Task.id == task_id))
+    result = await db.execute(select(models.User.tasks_version).filter(models.User.id == owner_id))
+    return result.scalar() or 0
+
+async def _touch_tasks(db: AsyncSession, owner_id: int):
+    # Aumenta la revisión de las tareas del usuario dentro de la misma transacción que el cambio
+    await db.execute(
+        update(models.User)
+        .filter(models.User.id == owner_id)
+        .values(tasks_version=models.User.tasks_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+async def get_task(db: AsyncSession, task_id: int, owner_id: Optional[int] = None):
+    """
+    Obtiene una tarea por su ID, opcionalmente restringida a un propietario.
+    """
+    query = select(models.Task).filter(models.Task.id == task_id)
+    if owner_id is not None:
+        query = query.filter(models.Task.owner_id == owner_id)
+    result = await db.execute(query)
     return result.scalars().first()
 
-async def get_tasks(db: AsyncSession, skip: int = 0, limit: int = 100):
+# Proyección de columnas de schemas.Task: los listados se validan en lote desde filas,
+# sin construir entidades ORM ni pasar por el mapa de identidad de la sesión
+TASK_COLUMNS = (
+    models.Task.id,
+    models.Task.title,
+    models.Task.description,
+    models.Task.completed,
+    models.Task.created_at,
+    models.Task.owner_id,
+    models.Task.version,
+)
+
+def _filtered_tasks(owner_id: int, filters: Optional[schemas.TaskFilter]):
+    query = select(*TASK_COLUMNS).filter(models.Task.owner_id == owner_id)
+    if filters is None:
+        return query
+    if filters.completed is not None:
+        # Literal y no parámetro: así el planificador puede usar el índice parcial ix_tasks_owner_pending
+        query = query.filter(models.Task.completed == (true() if filters.completed else false()))
+    if filters.created_after is not None:
+        query = query.filter(models.Task.created_at >= filters.created_after)
+    if filters.created_before is not None:
+        query = query.filter(models.Task.created_at < filters.created_before)
+    return query
+
+def _creation_order(order: str):
+    if order == "asc":
+        return models.Task.created_at.asc(), models.Task.id.asc()
+    return models.Task.created_at.desc(), models.Task.id.desc()
+
+def tasks_query(owner_id: int, skip: int = 0, limit: int = 100, filters: Optional[schemas.TaskFilter] = None):
+    """
+    Consulta del listado skip/limit. Sin `order` se mantiene el orden heredado por ID;
+    con `order` se ordena por (created_at, id), que cubren los índices por propietario.
+    """
+    query = _filtered_tasks(owner_id, filters)
+    if filters is not None and filters.order is not None:
+        query = query.order_by(*_creation_order(filters.order))
+    else:
+        query = query.order_by(models.Task.id)
+    return query.offset(skip).limit(limit)
+
+def tasks_page_query(owner_id: int, limit: int = 100, cursor: Optional[str] = None, filters: Optional[schemas.TaskFilter] = None):
+    """
+    Consulta de una página por cursor sobre (created_at, id), en orden descendente salvo `order=asc`.
+    Pide `limit + 1` filas para saber si hay página siguiente.
+    Lanza InvalidCursorError si el cursor no es válido.
+    """
+    query = _filtered_tasks(owner_id, filters)
+    order = filters.order if filters is not None and filters.order else "desc"
+    if cursor:
+        created_at, task_id = decode_cursor(cursor, 2)
+        task_id = parse_id(task_id)
+        # La columna se compara sin envolverla en funciones para aprovechar ix_tasks_owner_created_id.
+        # En SQLite es texto: el cursor se enlaza con el mismo formato con microsegundos en el que se
+        # guardan todas las filas (valor por defecto utc_now() y migración 0007 para las antiguas)
+        position = tuple_(models.Task.created_at, models.Task.id)
+        last_seen = tuple_(parse_datetime(created_at), task_id)
+        query = query.filter(position > last_seen if order == "asc" else position < last_seen)
+    return query.order_by(*_creation_order(order)).limit(limit + 1)
+
+async def get_tasks(db: AsyncSession, owner_id: int, skip: int = 0, limit: int = 100, filters: Optional[schemas.TaskFilter] = None) -> list[schemas.Task]:
+    """
+    Obtiene las tareas de un usuario con paginación clásica (skip y limit), filtros y orden opcionales.
+    Modo heredado: el coste crece con `skip`; preferir get_tasks_page.
+    """
+    result = await db.execute(tasks_query(owner_id, skip=skip, limit=limit, filters=filters))
+    return schemas.TaskListAdapter.validate_python(result.all(), from_attributes=True)
+
+async def get_tasks_page(db: AsyncSession, owner_id: int, limit: int = 100, cursor: Optional[str] = None, filters: Optional[schemas.TaskFilter] = None):
+    """
+    Obtiene una página de tareas de un usuario, por defecto de la más reciente a la más antigua,
+    usando paginación por cursor sobre (created_at, id). Devuelve (tareas, next_cursor).
+    Lanza InvalidCursorError si el cursor no es válido.
+    """
+    query = tasks_page_query(owner_id, limit=limit, cursor=cursor, filters=filters)
+    tasks = schemas.TaskListAdapter.validate_python((await db.execute(query)).all(), from_attributes=True)
+    next_cursor = None
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        next_cursor = encode_cursor(tasks[-1].created_at, tasks[-1].id)
+    return tasks, next_cursor
+
+async def get_task_cached(db: AsyncSession, task_id: int, owner_id: int) -> Optional[schemas.Task]:
+    """
+    Lectura de una tarea del usuario a través del caché de tareas (ver get_task).
+    """
+    async def load():
+        db_task = await get_task(db, task_id, owner_id=owner_id)
+        return schemas.Task.model_validate(db_task) if db_task else None
+
+    return await task_cache.get_item(owner_id, task_id, load, schemas.TaskAdapter)
+
+def _filters_key(filters: Optional[schemas.TaskFilter]) -> str:
+    return filters.model_dump_json(exclude_none=True) if filters is not None else ""
+
+async def get_tasks_json(db: AsyncSession, owner_id: int, skip: int = 0, limit: int = 100, filters: Optional[schemas.TaskFilter] = None,
+                         revision: Optional[int] = None) -> bytes:
+    """
+    Listado skip/limit ya serializado en JSON, a través del caché de tareas (ver get_tasks).
+    Se cachean los bytes: un acierto no vuelve a validar ni serializar. `revision` (la del ETag) forma
+    parte de la clave, así que un cuerpo cacheado nunca se sirve con el ETag de otra revisión.
+    """
+    async def load():
+        return schemas.TaskListAdapter.dump_json(await get_tasks(db, owner_id, skip=skip, limit=limit, filters=filters))
+
+    return await task_cache.get_list(owner_id, ("offset", revision, skip, limit, _filters_key(filters)), load, RAW_JSON)
+
+async def get_tasks_page_json(db: AsyncSession, owner_id: int, limit: int = 100, cursor: Optional[str] = None, filters: Optional[schemas.TaskFilter] = None,
+                              revision: Optional[int] = None) -> bytes:
+    """
+    Página por cursor ya serializada en JSON, a través del caché de tareas (ver get_tasks_page).
+    `revision` forma parte de la clave, como en get_tasks_json. Lanza InvalidCursorError si el cursor no es válido.
+    """
+    async def load():
+        tasks, next_cursor = await get_tasks_page(db, owner_id, limit=limit, cursor=cursor, filters=filters)
+        return schemas.TaskPageAdapter.dump_json(schemas.TaskPage(items=tasks, next_cursor=next_cursor))
+
+    return await task_cache.get_list(owner_id, ("cursor", revision, cursor or "", limit, _filters_key(filters)), load, RAW_JSON)
+
+async def search_tasks(db: AsyncSession, owner_id: int, q: str, limit: int = 50, cursor: Optional[str] = None):
+    """
+    Busca en el título y la descripción de las tareas del usuario, de la más a la menos relevante,
+    con paginación por cursor sobre (score, id). Devuelve (tareas, next_cursor).
+    Lanza InvalidCursorError si el cursor no es válido.
+    """
+    terms = search.search_terms(q)
+    if not terms:
+        return [], None
+    matches = search.ranked_matches(db.bind.dialect.name, TASK_COLUMNS, owner_id, terms).subquery()
+    query = select(matches)
+    if cursor:
+        score, task_id = decode_cursor(cursor, 2)
+        if not isinstance(score, (int, float)) or not math.isfinite(score):
+            raise InvalidCursorError(cursor)
+        task_id = parse_id(task_id)
+        query = query.filter(tuple_(matches.c.score, matches.c.id) < tuple_(score, task_id))
+    query = query.order_by(matches.c.score.desc(), matches.c.id.desc()).limit(limit + 1)
+    rows = (await db.execute(query)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].score, rows[-1].id)
+    return schemas.TaskListAdapter.validate_python(rows, from_attributes=True), next_cursor
+
+async def get_task_stats(db: AsyncSession, owner_id: int, by_day: bool = False, days: int = 30) -> schemas.TaskStats:
     """
-    Obtiene una lista de tareas con paginación (skip y limit).
+    Resumen de las tareas del usuario: total, completadas y pendientes.
+    Donde hay triggers de contadores (SQLite, PostgreSQL) es una lectura por clave primaria;
+    en el resto, un agregado sobre el índice del propietario.
+    Con `by_day` añade las tareas creadas por día en los últimos `days` días.
     """
-    result = await db.execute(select(models.Task).offset(skip).limit(limit))
-    return result.scalars().all()
+    dialect_name = db.bind.dialect.name
+    completed_count = func.coalesce(func.sum(case((models.Task.completed == true(), 1), else_=0)), 0)
+    if dialect_name in models.TASK_COUNTER_DIALECTS:
+        row = (await db.execute(
+            select(models.TaskCounter.total, models.TaskCounter.completed).filter(models.TaskCounter.owner_id == owner_id)
+        )).first()
+    else:
+        row = (await db.execute(
+            select(func.count(models.Task.id), completed_count).filter(models.Task.owner_id == owner_id)
+        )).first()
+    total, completed = row if row else (0, 0)
+    stats = schemas.TaskStats(total=total, completed=completed, pending=total - completed)
+    if by_day:
+        # SQLite guarda las fechas como texto (en UTC): date() devuelve 'AAAA-MM-DD'. En PostgreSQL el
+        # cast de timestamptz a date usa la zona horaria de la sesión; timezone('UTC', ...) fija días UTC
+        if dialect_name == "sqlite":
+            day = func.date(models.Task.created_at)
+        elif dialect_name == "postgresql":
+            # Literal y no parámetro: SELECT y GROUP BY deben ser la misma expresión
+            day = cast(func.timezone(literal_column("'UTC'"), models.Task.created_at), Date)
+        else:
+            day = cast(models.Task.created_at, Date)
+        since = datetime.now(timezone.utc) - timedelta(days=days)
+        result = await db.execute(
+            select(day.label("day"), func.count(models.Task.id).label("total"), completed_count.label("completed"))
+            .filter(models.Task.owner_id == owner_id, models.Task.created_at >= since)
+            .group_by(day)
+            .order_by(day)
+        )
+        stats.by_day = [schemas.TaskDayStats.model_validate(row, from_attributes=True) for row in result.all()]
+    return stats
+
+EXPORT_COLUMNS = (
+    models.Task.id,
+    models.Task.title,
+    models.Task.description,
+    models.Task.completed,
+    models.Task.created_at,
+    models.Task.owner_id,
+)
+
+async def stream_tasks(db: AsyncSession, owner_id: int, batch_size: int = 500):
+    """
+    Recorre todas las tareas de un usuario con un cursor del servidor, en lotes de `batch_size`.
+    Produce listas de filas (mappings de columnas) sin crear entidades ORM, con memoria constante.
+    """
+    result = await db.stream(
+        select(*EXPORT_COLUMNS)
+        .filter(models.Task.owner_id == owner_id)
+        .order_by(models.Task.created_at, models.Task.id)
+        .execution_options(yield_per=batch_size)
+    )
+    async for partition in result.mappings().partitions(batch_size):
+        yield partition
+
+def _tasks_changed(db: AsyncSession, owner_id: int, event_type: str, ids, tasks=None, invalidate_items: bool = True):
+    """
+    Registra los efectos de un cambio de tareas para después del commit: fija las lecturas del usuario
+    al primario (read-your-writes), invalida el caché de lectura y publica el evento para los
+    suscriptores de /tasks/events.
+    """
+    ids = list(ids)
+
+    async def effects():
+        replicas.pin(owner_id)
+        await task_cache.invalidate(owner_id, ids if invalidate_items else ())
+        await broker.publish(owner_id, event_type, ids, tasks)
+
+    after_commit(db, effects)
 
 async def create_task(db: AsyncSession, task: schemas.TaskCreate, user_id: int):
     """
@@ -62,30 +465,124 @@ async def create_task(db: AsyncSession, task: schemas.TaskCreate, user_id: int):
     """
     db_task = models.Task(**task.model_dump(), owner_id=user_id)
     db.add(db_task)
-    await db.commit()
-    await db.refresh(db_task)
+    await _touch_tasks(db, user_id)
+    await db.flush()
+    _tasks_changed(db, user_id, "created", [db_task.id], [schemas.Task.model_validate(db_task)], invalidate_items=False)
     return db_task
 
-async def update_task(db: AsyncSession, task_id: int, task: schemas.TaskUpdate):
+async def update_task(db: AsyncSession, task_id: int, task: schemas.TaskUpdate, owner_id: int) -> Optional[schemas.Task]:
     """
-    Actualiza una tarea existente.
+    Actualiza una tarea del usuario con un único UPDATE ... RETURNING.
+    La comprobación de propiedad va en el WHERE; devuelve None si la tarea no existe o es de otro usuario.
     """
-    db_task = await get_task(db, task_id)
-    if db_task:
-        update_data = task.model_dump(exclude_unset=True)
-        for key, value in update_data.items():
-            setattr(db_task, key, value)
-        await db.commit()
-        await db.refresh(db_task)
-    return db_task
+    update_data = task.model_dump(exclude_unset=True)
+    if not update_data:
+        db_task = await get_task(db, task_id, owner_id=owner_id)
+        return schemas.Task.model_validate(db_task) if db_task else None
+    stmt = (
+        update(models.Task)
+        .filter(models.Task.id == task_id, models.Task.owner_id == owner_id)
+        .values(**update_data, version=models.Task.version + 1)
+    )
+    if db.bind.dialect.update_returning:
+        db_task = (await db.execute(stmt.returning(models.Task))).scalars().first()
+    else:
+        # Motores sin RETURNING (MySQL/MariaDB): UPDATE y lectura posterior
+        result = await db.execute(stmt.execution_options(synchronize_session=False))
+        db_task = await get_task(db, task_id, owner_id=owner_id) if result.rowcount else None
+    # Se construye el esquema antes del commit, que expira los objetos ORM
+    updated = schemas.Task.model_validate(db_task) if db_task else None
+    if updated:
+        await _touch_tasks(db, owner_id)
+        _tasks_changed(db, owner_id, "updated", [task_id], [updated])
+    return updated
 
-async def delete_task(db: AsyncSession, task_id: int):
+async def delete_task(db: AsyncSession, task_id: int, owner_id: int) -> bool:
     """
-    Elimina una tarea por su ID.
+    Elimina una tarea del usuario con un único DELETE (RETURNING donde se soporta).
+    Devuelve True si se eliminó.
     """
-    db_task = await get_task(db, task_id)
-    if db_task:
-        await db.delete(db_task)
-        await db.commit()
-    return db_task
+    stmt = delete(models.Task).filter(models.Task.id == task_id, models.Task.owner_id == owner_id)
+    if db.bind.dialect.delete_returning:
+        deleted = (await db.execute(stmt.returning(models.Task.id))).first() is not None
+    else:
+        deleted = (await db.execute(stmt)).rowcount > 0
+    if deleted:
+        await _touch_tasks(db, owner_id)
+        _tasks_changed(db, owner_id, "deleted", [task_id])
+    return deleted
+
+async def _owned_task_ids(db: AsyncSession, task_ids: list[int], user_id: int) -> set[int]:
+    result = await db.execute(
+        select(models.Task.id).filter(models.Task.id.in_(task_ids), models.Task.owner_id == user_id)
+    )
+    return set(result.scalars().all())
+
+async def bulk_create_tasks(db: AsyncSession, tasks: list[schemas.TaskCreate], user_id: int) -> list[schemas.Task]:
+    """
+    Crea varias tareas en una sola transacción con un INSERT por lotes (RETURNING donde se soporta).
+    Devuelve las tareas creadas en el mismo orden de la petición.
+    """
+    rows = [dict(task.model_dump(), owner_id=user_id) for task in tasks]
+    if db.bind.dialect.insert_executemany_returning:
+        result = await db.execute(insert(models.Task).returning(models.Task, sort_by_parameter_order=True), rows)
+        db_tasks = result.scalars().all()
+    else:
+        db_tasks = [models.Task(**row) for row in rows]
+        db.add_all(db_tasks)
+        await db.flush()
+    # Se construyen los esquemas antes del commit, que expira los objetos ORM
+    created = [schemas.Task.model_validate(db_task) for db_task in db_tasks]
+    if created:
+        await _touch_tasks(db, user_id)
+        _tasks_changed(db, user_id, "created", [task.id for task in created], created, invalidate_items=False)
+    return created
 
+async def bulk_update_tasks(db: AsyncSession, items: list[schemas.TaskBulkUpdateItem], user_id: int) -> dict[int, schemas.Task]:
+    """
+    Actualiza varias tareas del usuario en una sola transacción.
+    Las filas con los mismos campos modificados se envían juntas (executemany por clave primaria).
+    Devuelve un diccionario id -> tarea actualizada; los IDs ausentes no existen o son de otro usuario.
+    """
+    owned = await _owned_task_ids(db, [item.id for item in items], user_id)
+    params = []
+    for item in items:
+        if item.id in owned:
+            data = item.model_dump(exclude_unset=True, exclude={"id"})
+            if data:
+                params.append(dict(data, id=item.id))
+    if params:
+        # Las tareas se vuelven a leer abajo, por eso no se sincroniza la sesión
+        await db.execute(
+            update(models.Task)
+            .filter(models.Task.owner_id == user_id)
+            .values(version=models.Task.version + 1)
+            .execution_options(synchronize_session=None),
+            params,
+        )
+        await _touch_tasks(db, user_id)
+    updated = {}
+    if owned:
+        result = await db.execute(select(models.Task).filter(models.Task.id.in_(owned)).execution_options(populate_existing=True))
+        updated = {db_task.id: schemas.Task.model_validate(db_task) for db_task in result.scalars().all()}
+    if params:
+        changed = [param["id"] for param in params]
+        _tasks_changed(db, user_id, "updated", changed, [updated[task_id] for task_id in changed if task_id in updated])
+    return updated
+
+async def bulk_delete_tasks(db: AsyncSession, task_ids: list[int], user_id: int) -> set[int]:
+    """
+    Elimina varias tareas del usuario con un único DELETE ... WHERE id IN (...) RETURNING id.
+    Devuelve el conjunto de IDs eliminados.
+    """
+    stmt = delete(models.Task).filter(models.Task.id.in_(task_ids), models.Task.owner_id == user_id)
+    if db.bind.dialect.delete_returning:
+        deleted = set((await db.execute(stmt.returning(models.Task.id))).scalars().all())
+    else:
+        deleted = await _owned_task_ids(db, task_ids, user_id)
+        if deleted:
+            await db.execute(delete(models.Task).filter(models.Task.id.in_(deleted)))
+    if deleted:
+        await _touch_tasks(db, user_id)
+        _tasks_changed(db, user_id, "deleted", sorted(deleted))
+    return deleted
@@ -4,35 +4,134 @@ GitHub: https://github.com/migbertweb
 License: GPL-3.0
 Description: Módulo de inyección de dependencias que proporciona recursos compartidos como sesiones de base de datos y el usuario autenticado actual.
 """
-from fastapi import Depends, HTTPException, status
+from typing import Annotated, Optional
+
+from fastapi import Depends, Header, HTTPException, Query, WebSocketException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
 from sqlalchemy.ext.asyncio import AsyncSession
 from . import crud, models, schemas, auth
-from .database import get_db
+from .cache import token_cache
+from .database import Reader, commit, get_db, replicas, rollback
+from .keys import InvalidTokenError, get_keyring
+from .revocation import denylist
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+async def unit_of_work(db: AsyncSession = Depends(get_db)):
     """
-    Obtiene el usuario actual basado en el token JWT proporcionado.
-    Valida el token y recupera el usuario de la base de datos.
+    Unidad de trabajo de una petición de escritura: la misma sesión de get_db (compartida con la
+    autenticación) y una sola transacción. Las funciones de crud solo hacen flush; aquí se hace el
+    único commit, o el rollback si el endpoint lanza una excepción.
+    Se usa con scope="function" (ver UnitOfWork) para confirmar antes de enviar la respuesta.
+    """
+    try:
+        yield db
+    except BaseException:
+        await rollback(db)
+        raise
+    await commit(db)
+
+UnitOfWork = Annotated[AsyncSession, Depends(unit_of_work, scope="function")]
+
+async def lookup_principal(db: AsyncSession, email: str) -> Optional[schemas.Principal]:
+    """
+    Identidad del usuario leída de una réplica. Si aún no está en ella (un alta reciente que no se
+    ha replicado) se vuelve a buscar en el primario.
+    """
+    async with replicas.reader(db) as reader:
+        principal = await reader.run(crud.get_principal_by_email, email=email)
+        if principal is None and reader.session is not db:
+            principal = await crud.get_principal_by_email(db, email=email)
+    return principal
+
+async def authenticate(token: str, db: AsyncSession) -> schemas.Principal:
+    """
+    Valida un token JWT y devuelve la identidad del usuario.
+    Si el token ya fue verificado recientemente se devuelve la identidad cacheada
+    sin decodificar el JWT ni consultar la base de datos. La lista de revocación se
+    comprueba siempre, también con el token cacheado.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="No se pudieron validar las credenciales",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    cached = token_cache.get(token)
+    if cached is not None:
+        principal, session = cached
+        if denylist.is_revoked(*session):
+            raise credentials_exception
+        return principal
+
     try:
-        payload = jwt.decode(token, auth.settings.SECRET_KEY, algorithms=[auth.settings.ALGORITHM])
+        payload = get_keyring().decode(token)
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
         token_data = schemas.TokenData(email=email)
-    except JWTError:
+    except InvalidTokenError:
+        raise credentials_exception
+    session = auth.token_session(payload)
+    if denylist.is_revoked(*session):
         raise credentials_exception
-    user = await crud.get_user_by_email(db, email=token_data.email)
-    if user is None:
+    principal = await lookup_principal(db, token_data.email)
+    if principal is None:
         raise credentials_exception
-    return user
+    if not principal.is_active:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Usuario inactivo")
+    token_cache.set_token(token, principal, exp=payload.get("exp"), session=session)
+    return principal
 
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> schemas.Principal:
+    """
+    Obtiene el usuario actual basado en el token JWT proporcionado.
+    """
+    return await authenticate(token, db)
+
+async def get_reader(current_user: schemas.Principal = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
+    """
+    Lecturas del usuario actual (ver database.Reader): en una réplica si hay alguna disponible y el
+    usuario no ha escrito en los últimos READ_YOUR_WRITES_SECONDS; si no, en la sesión del primario.
+    """
+    if replicas.is_pinned(current_user.id):
+        yield Reader(replicas, db, db)
+        return
+    async with replicas.reader(db) as reader:
+        yield reader
+
+async def get_stream_user(
+    authorization: Optional[str] = Header(None),
+    token: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_db, scope="function"),
+) -> schemas.Principal:
+    """
+    Usuario de una conexión de streaming (/tasks/events). EventSource no permite cabeceras,
+    por eso el token también se acepta en el parámetro `token`.
+    La sesión se cierra al terminar el endpoint, antes de transmitir: un stream largo no retiene
+    una conexión del pool.
+    """
+    scheme, _, credentials = (authorization or "").partition(" ")
+    if scheme.lower() == "bearer" and credentials:
+        token = credentials
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return await authenticate(token, db)
+
+async def get_websocket_user(token: Optional[str] = Query(None), db: AsyncSession = Depends(get_db)) -> schemas.Principal:
+    """
+    Usuario de una conexión WebSocket, autenticado con el parámetro `token`.
+    Cierra la conexión con el código 1008 (violación de política) si el token no es válido.
+    """
+    if not token:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason="Not authenticated")
+    try:
+        return await authenticate(token, db)
+    except HTTPException as exc:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=exc.detail)
+    finally:
+        # La sesión viviría tanto como el WebSocket: se libera su conexión ya
+        await db.close()
@@ -0,0 +1,49 @@
+"""
+Author: Migbert Yanez
+GitHub: https://github.com/migbertweb
+License: GPL-3.0
+Description: ETags y peticiones condicionales (If-None-Match) para las lecturas de tareas.
+Permiten responder 304 Not Modified sin serializar cuando el cliente ya tiene la versión actual.
+"""
+import hashlib
+from typing import Optional
+
+from fastapi import Response
+
+# Las respuestas son por usuario y deben revalidarse siempre (el ETag hace barata la revalidación)
+CACHE_CONTROL = "private, no-cache"
+
+def task_etag(task) -> str:
+    """
+    ETag fuerte de una tarea, derivado de su ID y su versión.
+    """
+    return f'"t{task.id}v{task.version}"'
+
+def list_etag(owner_id: int, revision: int, query: str = "") -> str:
+    """
+    ETag fuerte de un listado de tareas: revisión de la colección del usuario más un resumen
+    de los parámetros de consulta (cada página o filtro es una representación distinta).
+    """
+    digest = hashlib.blake2s(query.encode(), digest_size=6).hexdigest()
+    return f'"l{owner_id}r{revision}-{digest}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Indica si la cabecera If-None-Match coincide con el ETag actual.
+    Usa la comparación débil (RFC 9110): se ignora el prefijo W/.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(","))
+
+def set_cache_headers(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+
+def not_modified(etag: str) -> Response:
+    """
+    Respuesta 304 sin cuerpo con las mismas cabeceras de caché que la respuesta completa.
+    """
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
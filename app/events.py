@@ -0,0 +1,263 @@
+"""
+Author: Migbert Yanez
+GitHub: https://github.com/migbertweb
+License: GPL-3.0
+Description: Broker publicación/suscripción de cambios de tareas para /tasks/events (SSE y WebSocket).
+Reparte los eventos por usuario, desconecta a los consumidores lentos, guarda un historial corto para
+reanudar con Last-Event-ID y puede propagarse entre procesos con LISTEN/NOTIFY de PostgreSQL.
+"""
+import asyncio
+import json
+import logging
+import uuid
+from collections import OrderedDict, deque
+from typing import Optional
+
+from .database import settings
+
+logger = logging.getLogger("app.events")
+
+# Máximo de usuarios con historial en memoria (se descartan los menos recientes)
+MAX_HISTORY_USERS = 10000
+
+class Event:
+    """
+    Evento ya serializado: `data` es JSON y se comparte entre todos los suscriptores.
+    """
+    __slots__ = ("id", "type", "data")
+
+    def __init__(self, id: str, type: str, data: str):
+        self.id = id
+        self.type = type
+        self.data = data
+
+    def sse(self) -> str:
+        return f"id: {self.id}\nevent: {self.type}\ndata: {self.data}\n\n"
+
+    def ws(self) -> str:
+        return f'{{"id":{json.dumps(self.id)},"type":{json.dumps(self.type)},"data":{self.data}}}'
+
+# Marca de fin de stream: el consumidor se quedó atrás y debe reconectar
+CLOSED = Event("", "closed", "null")
+
+def encode_event(event_type: str, ids, tasks=None) -> str:
+    """
+    JSON de un evento: los IDs afectados y, en altas y cambios, las tareas completas.
+    """
+    payload = {"type": event_type, "ids": list(ids)}
+    if tasks is not None:
+        payload["tasks"] = [task.model_dump(mode="json") for task in tasks]
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+
+class Subscription:
+    """
+    Conexión suscrita a los eventos de un usuario. Primero entrega los eventos reenviados
+    (`backlog`) y después los nuevos, desde una cola acotada.
+    """
+    def __init__(self, broker: "EventBroker", user_id: int, maxsize: int, backlog=()):
+        self.broker = broker
+        self.user_id = user_id
+        self.dropped = False
+        self._backlog = deque(backlog)
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    def offer(self, event: Event) -> bool:
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            # Consumidor lento: se vacía su cola y se le cierra el stream; al reconectar
+            # con Last-Event-ID recupera lo perdido del historial
+            self.dropped = True
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(CLOSED)
+            return False
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Event]:
+        """
+        Siguiente evento, None si pasa `timeout` sin eventos (momento de enviar un keep-alive)
+        o CLOSED si hay que cerrar el stream.
+        """
+        if self._backlog:
+            return self._backlog.popleft()
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+class MemoryBackend:
+    """
+    Backend de un solo proceso: lo publicado se entrega directamente.
+    """
+    max_payload = None
+
+    def __init__(self, broker: "EventBroker"):
+        self.broker = broker
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def publish(self, user_id: int, event: Event):
+        self.broker.deliver(user_id, event)
+
+class PostgresNotifyBackend:
+    """
+    Backend entre procesos sobre LISTEN/NOTIFY de PostgreSQL (requiere asyncpg).
+    Cada proceso escucha el canal y entrega a sus propios suscriptores, incluido el que publica,
+    así todos los procesos ven los eventos en el mismo orden e historial.
+    """
+    CHANNEL = "task_events"
+    # NOTIFY admite cargas de menos de 8000 bytes
+    max_payload = 7000
+
+    def __init__(self, broker: "EventBroker", dsn: str):
+        self.broker = broker
+        self.dsn = dsn.replace("postgresql+asyncpg://", "postgresql://", 1)
+        self._conn = None
+        self._lock = asyncio.Lock()
+
+    async def start(self):
+        import asyncpg
+
+        self._conn = await asyncpg.connect(self.dsn)
+        await self._conn.add_listener(self.CHANNEL, self._on_notify)
+        self._conn.add_termination_listener(self._on_terminate)
+
+    async def stop(self):
+        if self._conn is not None and not self._conn.is_closed():
+            await self._conn.close()
+        self._conn = None
+
+    def _on_notify(self, connection, pid, channel, payload):
+        try:
+            user_id, event_id, event_type, data = json.loads(payload)
+        except (ValueError, TypeError):
+            logger.warning("Notificación de eventos inválida: %r", payload[:200])
+            return
+        self.broker.deliver(user_id, Event(event_id, event_type, json.dumps(data, separators=(",", ":"), ensure_ascii=False)))
+
+    def _on_terminate(self, connection):
+        logger.warning("Conexión LISTEN de eventos perdida; reconectando")
+        asyncio.get_running_loop().create_task(self._reconnect())
+
+    async def _reconnect(self, delay: float = 1.0):
+        while True:
+            try:
+                await self.start()
+                return
+            except Exception:
+                logger.exception("No se pudo reconectar LISTEN de eventos")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+
+    async def publish(self, user_id: int, event: Event):
+        payload = f"[{user_id},{json.dumps(event.id)},{json.dumps(event.type)},{event.data}]"
+        # Una conexión asyncpg no admite consultas concurrentes
+        async with self._lock:
+            await self._conn.execute("SELECT pg_notify($1, $2)", self.CHANNEL, payload)
+
+class EventBroker:
+    """
+    Reparto de eventos por usuario. Cada suscripción tiene una cola acotada: si se llena, el consumidor
+    se desconecta en lugar de bloquear a los demás o acumular memoria. Se guarda un historial corto por
+    usuario para reenviar lo perdido a quien reconecta con el ID del último evento recibido.
+    """
+    def __init__(self, queue_size: int = 100, history_size: int = 500, backend: str = "memory"):
+        self.queue_size = queue_size
+        self.history_size = history_size
+        self.published = 0
+        self.dropped = 0
+        self._subscribers: dict[int, set[Subscription]] = {}
+        self._history: "OrderedDict[int, deque[Event]]" = OrderedDict()
+        if backend == "postgres":
+            self.backend = PostgresNotifyBackend(self, settings.DATABASE_URL)
+        elif backend == "memory":
+            self.backend = MemoryBackend(self)
+        else:
+            raise ValueError(f"Backend de eventos no soportado: {backend}")
+
+    async def start(self):
+        await self.backend.start()
+
+    async def stop(self):
+        await self.backend.stop()
+
+    def subscribe(self, user_id: int, last_event_id: Optional[str] = None) -> Subscription:
+        """
+        Suscribe una conexión a los eventos de un usuario.
+        Con `last_event_id` se reenvían los eventos posteriores del historial; si ese ID ya no
+        está en el historial se envía un evento "reset" (el cliente debe recargar el listado).
+        """
+        backlog = []
+        if last_event_id:
+            history = list(self._history.get(user_id, ()))
+            position = next((index for index, event in enumerate(history) if event.id == last_event_id), None)
+            if position is None:
+                backlog = [Event(uuid.uuid4().hex[:16], "reset", encode_event("reset", []))]
+            else:
+                backlog = history[position + 1:]
+        subscription = Subscription(self, user_id, self.queue_size, backlog)
+        self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.user_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.user_id]
+
+    async def publish(self, user_id: int, event_type: str, ids, tasks=None):
+        """
+        Publica un cambio de tareas de un usuario. Debe llamarse después del commit.
+        Si el evento no cabe en el backend se envía sin las tareas (solo los IDs).
+        Un fallo del backend se registra pero no se propaga: el cambio ya está confirmado.
+        """
+        data = encode_event(event_type, ids, tasks)
+        limit = self.backend.max_payload
+        if limit is not None and len(data.encode()) > limit:
+            data = encode_event(event_type, ids)
+            if len(data.encode()) > limit:
+                event_type, data = "reset", encode_event("reset", [])
+        try:
+            await self.backend.publish(user_id, Event(uuid.uuid4().hex[:16], event_type, data))
+        except Exception:
+            logger.exception("No se pudo publicar el evento %s del usuario %s", event_type, user_id)
+
+    def deliver(self, user_id: int, event: Event):
+        """
+        Guarda el evento en el historial del usuario y lo entrega a sus suscripciones locales.
+        """
+        self.published += 1
+        history = self._history.get(user_id)
+        if history is None:
+            history = self._history[user_id] = deque(maxlen=self.history_size)
+            while len(self._history) > MAX_HISTORY_USERS:
+                self._history.popitem(last=False)
+        else:
+            self._history.move_to_end(user_id)
+        history.append(event)
+        for subscription in list(self._subscribers.get(user_id, ())):
+            if not subscription.offer(event):
+                self.dropped += 1
+                self.unsubscribe(subscription)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": sum(len(subscribers) for subscribers in self._subscribers.values()),
+            "published": self.published,
+            "dropped_consumers": self.dropped,
+        }
+
+broker = EventBroker(
+    queue_size=settings.EVENTS_QUEUE_SIZE,
+    history_size=settings.EVENTS_HISTORY_SIZE,
+    backend=settings.EVENTS_BACKEND,
+)
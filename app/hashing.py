@@ -0,0 +1,91 @@
+"""
+Author: Migbert Yanez
+GitHub: https://github.com/migbertweb
+License: GPL-3.0
+Description: Pool de trabajadores acotado para el hash y la verificación de contraseñas (bcrypt), de modo que estas operaciones costosas no bloqueen el bucle de eventos.
+"""
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+from . import auth
+from .database import settings
+
+class HashingOverloadedError(Exception):
+    """
+    Se lanza cuando el pool de hashing está saturado (trabajadores ocupados y cola llena).
+    La aplicación la traduce a una respuesta 503 para descartar carga.
+    """
+    pass
+
+class PasswordHasher:
+    """
+    Ejecuta bcrypt en un pool de hilos o de procesos con un límite de concurrencia
+    (max_workers) y una profundidad máxima de cola (max_queue).
+    El modo "inline" ejecuta bcrypt de forma síncrona, como antes de existir el pool.
+    """
+    def __init__(self, mode: str = "thread", max_workers: int = 4, max_queue: int = 64):
+        if mode not in ("thread", "process", "inline"):
+            raise ValueError(f"Modo de hashing no soportado: {mode}")
+        self.mode = mode
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor: Optional[Executor] = None
+        # Solo se modifica desde el bucle de eventos, por lo que no requiere bloqueo
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        """
+        Número de operaciones en ejecución o en espera dentro del pool.
+        """
+        return self._pending
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.mode == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def run(self, func, *args):
+        """
+        Ejecuta `func(*args)` en el pool. Lanza HashingOverloadedError si se excede la capacidad.
+        """
+        if self.mode == "inline":
+            return func(*args)
+        if self._pending >= self.max_workers + self.max_queue:
+            raise HashingOverloadedError()
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self._pending -= 1
+
+    def shutdown(self):
+        """
+        Detiene el pool de trabajadores, cancelando las tareas que aún no han comenzado.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+hasher = PasswordHasher(
+    mode=settings.HASH_EXECUTOR,
+    max_workers=settings.HASH_MAX_WORKERS,
+    max_queue=settings.HASH_MAX_QUEUE,
+)
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verifica una contraseña contra su hash sin bloquear el bucle de eventos.
+    """
+    return await hasher.run(auth.verify_password, plain_password, hashed_password)
+
+async def hash_password(password: str) -> str:
+    """
+    Genera el hash de una contraseña sin bloquear el bucle de eventos.
+    """
+    return await hasher.run(auth.get_password_hash, password)
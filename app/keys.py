@@ -0,0 +1,160 @@
+"""
+Author: Migbert Yanez
+GitHub: https://github.com/migbertweb
+License: GPL-3.0
+Description: Anillo de claves JWT. Las claves se cargan una sola vez (en el primer uso o en el calentamiento
+del arranque) como objetos de clave ya construidos, indexados por `kid`. Soporta HS256 (secreto compartido) y
+claves asimétricas ES256/RS256 con rotación sin cortes y publicación de las claves públicas como JWKS.
+python-jose y cryptography se importan al construir el anillo, no al importar la aplicación.
+"""
+import base64
+import functools
+import hashlib
+import json
+from pathlib import Path
+from typing import Optional
+
+from .database import settings
+
+# Curva EC -> algoritmo JWS
+EC_ALGORITHMS = {"secp256r1": "ES256", "secp384r1": "ES384", "secp521r1": "ES512"}
+# Miembros que definen una clave pública en la huella RFC 7638
+THUMBPRINT_MEMBERS = {"EC": ("crv", "kty", "x", "y"), "RSA": ("e", "kty", "n")}
+
+class InvalidTokenError(ValueError):
+    """
+    Token con firma, `kid`, formato o expiración no válidos.
+    """
+
+def _b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+def _load_pem(pem: bytes):
+    """
+    Carga una clave PEM privada o, si no lo es, pública.
+    """
+    from cryptography.hazmat.primitives import serialization
+
+    try:
+        return serialization.load_pem_private_key(pem, password=None)
+    except ValueError:
+        return serialization.load_pem_public_key(pem)
+
+def key_algorithm(pem: bytes, preferred: str = "RS256") -> str:
+    """
+    Algoritmo de una clave PEM según su tipo: la curva en EC y `preferred` (RS*/PS*) en RSA.
+    """
+    from cryptography.hazmat.primitives.asymmetric import ec, rsa
+
+    key = _load_pem(pem)
+    if isinstance(key, (ec.EllipticCurvePrivateKey, ec.EllipticCurvePublicKey)):
+        try:
+            return EC_ALGORITHMS[key.curve.name]
+        except KeyError:
+            raise ValueError(f"Curva no soportada: {key.curve.name}")
+    if isinstance(key, (rsa.RSAPrivateKey, rsa.RSAPublicKey)):
+        return preferred if preferred[:2] in ("RS", "PS") else "RS256"
+    raise ValueError(f"Tipo de clave no soportado: {type(key).__name__}")
+
+def thumbprint(public_jwk: dict) -> str:
+    """
+    Huella SHA-256 de una clave pública (RFC 7638), usada como `kid`.
+    """
+    members = {name: public_jwk[name] for name in THUMBPRINT_MEMBERS[public_jwk["kty"]]}
+    canonical = json.dumps(members, separators=(",", ":"), sort_keys=True)
+    return _b64url(hashlib.sha256(canonical.encode()).digest())
+
+class SigningKey:
+    """
+    Clave construida una sola vez: los objetos de jose se reutilizan en cada firma y verificación.
+    En las claves asimétricas se verifica con la mitad pública (`verify_key`).
+    """
+    __slots__ = ("kid", "algorithm", "key", "verify_key", "public_jwk")
+
+    def __init__(self, kid: Optional[str], algorithm: str, key, verify_key=None, public_jwk: Optional[dict] = None):
+        self.kid = kid
+        self.algorithm = algorithm
+        self.key = key
+        self.verify_key = verify_key or key
+        self.public_jwk = public_jwk
+
+    @classmethod
+    def from_secret(cls, secret: str, algorithm: str) -> "SigningKey":
+        from jose import jwk
+
+        # Los secretos compartidos no llevan kid ni se publican
+        return cls(None, algorithm, jwk.construct(secret, algorithm))
+
+    @classmethod
+    def from_pem(cls, pem: bytes, algorithm: Optional[str] = None) -> "SigningKey":
+        from jose import jwk
+
+        algorithm = algorithm or key_algorithm(pem)
+        key = jwk.construct(pem, algorithm)
+        public_key = key if key.is_public() else key.public_key()
+        public_jwk = public_key.to_dict()
+        kid = thumbprint(public_jwk)
+        public_jwk.update(kid=kid, use="sig", alg=algorithm)
+        return cls(kid, algorithm, key, public_key, public_jwk)
+
+class KeyRing:
+    """
+    Clave activa de firma más las claves retiradas que se siguen aceptando al verificar.
+    Los tokens firmados con claves asimétricas llevan el `kid` en la cabecera, así la verificación
+    usa directamente la clave correcta y solo admite su algoritmo (evita la confusión de algoritmos).
+    """
+    def __init__(self, active: SigningKey, retired: tuple = ()):
+        self.active = active
+        self._by_kid = {key.kid: key for key in (active, *retired) if key.kid is not None}
+
+    @classmethod
+    def from_settings(cls, config=settings) -> "KeyRing":
+        """
+        Con un algoritmo HS* firma con SECRET_KEY. Con ES*/RS* firma con la clave privada de
+        JWT_PRIVATE_KEY_FILE y acepta además las claves de JWT_PUBLIC_KEY_FILES (rotación).
+        """
+        if config.ALGORITHM.startswith("HS"):
+            return cls(SigningKey.from_secret(config.SECRET_KEY, config.ALGORITHM))
+        if not config.JWT_PRIVATE_KEY_FILE:
+            raise ValueError(f"{config.ALGORITHM} requiere JWT_PRIVATE_KEY_FILE")
+        active = SigningKey.from_pem(Path(config.JWT_PRIVATE_KEY_FILE).read_bytes(), config.ALGORITHM)
+        retired = []
+        for path in filter(None, (item.strip() for item in config.JWT_PUBLIC_KEY_FILES.split(","))):
+            pem = Path(path).read_bytes()
+            retired.append(SigningKey.from_pem(pem, key_algorithm(pem, config.ALGORITHM)))
+        return cls(active, tuple(retired))
+
+    def encode(self, claims: dict) -> str:
+        from jose import jwt
+
+        headers = {"kid": self.active.kid} if self.active.kid else None
+        return jwt.encode(claims, self.active.key, algorithm=self.active.algorithm, headers=headers)
+
+    def decode(self, token: str) -> dict:
+        """
+        Verifica un token y devuelve sus claims. Lanza InvalidTokenError si la firma, el `kid` o la
+        expiración no son válidos. Los tokens sin `kid` se verifican con la clave activa.
+        """
+        from jose import JWTError, jwt
+
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+            key = self.active if kid is None else self._by_kid.get(kid)
+            if key is None:
+                raise InvalidTokenError("Clave de firma desconocida")
+            return jwt.decode(token, key.verify_key, algorithms=[key.algorithm])
+        except JWTError as exc:
+            raise InvalidTokenError(str(exc)) from exc
+
+    def jwks(self) -> dict:
+        """
+        Claves públicas en formato JWK Set (vacío con secretos compartidos).
+        """
+        return {"keys": [key.public_jwk for key in self._by_kid.values()]}
+
+@functools.lru_cache(maxsize=None)
+def get_keyring() -> KeyRing:
+    """
+    Anillo de claves de la aplicación, construido una sola vez.
+    """
+    return KeyRing.from_settings()
@@ -4,58 +4,92 @@ GitHub: https://github.com/migbertweb
 License: GPL-3.0
 Description: Punto de entrada principal para la aplicación FastAPI. Configura la aplicación, el middleware, la conexión a la base de datos y define las rutas de la API para usuarios y tareas.
 """
-from fastapi import FastAPI, Depends, HTTPException, status, Request
+from fastapi import FastAPI, Depends, Header, HTTPException, status, Query, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional, Union
 from contextlib import asynccontextmanager
 from typing import Annotated
-from datetime import timedelta
+from datetime import datetime, timedelta
 from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
-from starlette.middleware.base import BaseHTTPMiddleware
-import time
+import asyncio
+import json
 import logging
 
-from . import crud, models, schemas, auth, deps
-from .database import engine, get_db, Base
+from . import crud, schemas, auth, deps, etags, hashing, metrics, migrations, ratelimit
+from .responses import FastJSONResponse
+from .database import Reader, engine, replicas, SessionLocal, settings, pool_stats, prewarm_pool
+from .cache import task_cache, token_cache
+from .events import CLOSED, EventBroker, broker
+from .keys import get_keyring
+from .revocation import denylist
+from .pagination import InvalidCursorError
 
 # Configuración de logs
 logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+logger = logging.getLogger("app.main")
 
-class LoggingMiddleware(BaseHTTPMiddleware):
+# Configuración de límites de velocidad (Rate Limiting)
+# El almacenamiento es compartido entre workers/réplicas según RATE_LIMIT_STORAGE_URI
+limiter = Limiter(
+    key_func=ratelimit.client_ip,
+    storage_uri=settings.RATE_LIMIT_STORAGE_URI,
+    strategy=settings.RATE_LIMIT_STRATEGY,
+    enabled=settings.RATE_LIMIT_ENABLED,
+)
+
+async def warm_up():
     """
-    Middleware para registrar cada solicitud HTTP que entra a la aplicación.
-    Mide el tiempo de procesamiento y registra el método, URL y código de estado.
+    Trabajo de arranque que no bloquea la primera petición: carga el anillo de claves y bcrypt
+    (fuera del bucle de eventos), abre conexiones del pool y limpia revocaciones expiradas.
     """
-    async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
-        response = await call_next(request)
-        process_time = time.time() - start_time
-        logger.info(f"{request.method} {request.url} - {response.status_code} - {process_time:.4f}s")
-        return response
-
-# Configuración de límites de velocidad (Rate Limiting)
-limiter = Limiter(key_func=get_remote_address)
+    try:
+        await asyncio.to_thread(auth.warm_up)
+        if settings.DB_POOL_PREWARM > 0:
+            await prewarm_pool(engine, settings.DB_POOL_PREWARM)
+        async with SessionLocal() as db:
+            await denylist.purge_expired(db)
+    except Exception:
+        logger.exception("Error en el calentamiento del arranque")
 
 # Configuración para crear tablas al inicio
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     Gestor de contexto para el ciclo de vida de la aplicación.
-    Crea las tablas de la base de datos al iniciar la aplicación.
+    Aplica las migraciones pendientes; con el esquema al día es una sola consulta a `schema_version`
+    (nada con DB_INIT_ON_STARTUP=false, p. ej. en los workers de app.serve, que lo hace antes de lanzarlos).
+    El resto del calentamiento sigue en segundo plano mientras se atienden peticiones.
     """
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    if settings.DB_INIT_ON_STARTUP:
+        await migrations.migrate(engine)
+    await broker.start()
+    await denylist.load(SessionLocal)
+    warm_up_task = asyncio.create_task(warm_up())
+    revocation_sync = asyncio.create_task(denylist.run(SessionLocal, settings.REVOCATION_SYNC_SECONDS))
     yield
+    warm_up_task.cancel()
+    revocation_sync.cancel()
+    await broker.stop()
+    hashing.hasher.shutdown()
+
+async def hashing_overloaded_handler(request: Request, exc: hashing.HashingOverloadedError):
+    """
+    Responde 503 cuando el pool de hashing de contraseñas está saturado.
+    """
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Servicio saturado, inténtalo de nuevo en unos segundos"},
+        headers={"Retry-After": "1"},
+    )
 
 app = FastAPI(title="Gestor de Tareas API", description="API para gestionar tareas con FastAPI y Postgres", lifespan=lifespan)
 
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+app.add_exception_handler(hashing.HashingOverloadedError, hashing_overloaded_handler)
 
 # 1. CORS Middleware debe ser el primero en añadirse para procesar preflights correctamente
 app.add_middleware(
@@ -74,13 +108,44 @@ app.add_middleware(
 )
 
 # 2. Otros middlewares
-app.add_middleware(LoggingMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
+
+@app.get("/stats", include_in_schema=False)
+async def read_stats():
+    """
+    Métricas internas para monitorización (cachés de tokens y de tareas, eventos, pool de conexiones).
+    """
+    return {"token_cache": token_cache.stats(), "task_cache": task_cache.stats(), "events": broker.stats(), "denylist": denylist.stats(), "db_pool": pool_stats(), "db_replicas": replicas.stats()}
+
+@app.get("/metrics", include_in_schema=False)
+async def read_metrics():
+    """
+    Métricas en formato de texto de Prometheus: latencia, estados, peticiones en curso,
+    tiempo de base de datos por ruta, cachés de tokens y de tareas y pool de conexiones.
+    """
+    extra = (
+        metrics.gauges_from_stats("token_cache", token_cache.stats())
+        + metrics.gauges_from_stats("task_cache", task_cache.stats())
+        + metrics.gauges_from_stats("events", broker.stats())
+        + metrics.gauges_from_stats("denylist", denylist.stats())
+        + metrics.gauges_from_stats("db_pool", pool_stats())
+        + metrics.gauges_from_stats("db_replicas", replicas.stats())
+    )
+    return PlainTextResponse(metrics.registry.render(extra), media_type="text/plain; version=0.0.4")
+
+@app.get("/.well-known/jwks.json", include_in_schema=False)
+async def read_jwks():
+    """
+    Claves públicas de firma de los tokens (JWK Set), para que otros servicios verifiquen los tokens
+    localmente. Incluye las claves retiradas que aún se aceptan; vacío si se firma con HS256.
+    """
+    return JSONResponse(get_keyring().jwks(), headers={"Cache-Control": "public, max-age=300"})
 
 @app.post("/token", response_model=schemas.Token)
 @limiter.limit("5/minute")
 async def login_for_access_token(
     request: Request,
-    db: AsyncSession = Depends(get_db)
+    db: deps.UnitOfWork,
 ):
     """
     Endpoint para autenticar usuarios y obtener un token de acceso (JWT).
@@ -113,72 +178,297 @@ async def login_for_access_token(
             detail="Se requiere usuario (username/email) y contraseña. Si usas JSON, envía 'username' y 'password'.",
         )
 
-    user = await crud.get_user_by_email(db, email=username)
-    if not user or not auth.verify_password(password, user.hashed_password):
+    user = await crud.get_user_credentials_by_email(db, email=username)
+    if not user or not await hashing.verify_password(password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Nombre de usuario o contraseña incorrectos",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    refresh_token, session_id = await crud.create_refresh_token(db, user_id=user.id)
+    return _token_response(user.email, session_id, refresh_token)
+
+def _token_response(email: str, session_id: str, refresh_token: str) -> dict:
     access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = auth.create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data={"sub": email, "sid": session_id}, expires_delta=access_token_expires
     )
-    return {"access_token": access_token, "token_type": "bearer"}
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+        "expires_in": int(access_token_expires.total_seconds()),
+    }
+
+@app.post("/token/refresh", response_model=schemas.Token)
+async def refresh_access_token(body: schemas.RefreshRequest, db: deps.UnitOfWork):
+    """
+    Renueva el token de acceso con un token de refresco, sin volver a verificar la contraseña.
+    El token de refresco rota: la respuesta trae uno nuevo y el usado deja de valer
+    (reutilizarlo cierra la sesión completa).
+    """
+    try:
+        user, refresh_token, session_id = await crud.rotate_refresh_token(db, body.refresh_token)
+    except auth.InvalidRefreshTokenError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token de refresco inválido o expirado",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return _token_response(user.email, session_id, refresh_token)
+
+@app.post("/logout")
+async def logout(
+    db: deps.UnitOfWork,
+    all_sessions: bool = False,
+    token: str = Depends(deps.oauth2_scheme),
+    current_user: schemas.Principal = Depends(deps.get_current_user),
+):
+    """
+    Cierra la sesión actual: el token de acceso y su token de refresco dejan de valer.
+    Con `all_sessions=true` cierra todas las sesiones del usuario.
+    """
+    await crud.logout(db, current_user.id, get_keyring().decode(token), all_sessions=all_sessions)
+    return {"ok": True}
 
 @app.post("/users/", response_model=schemas.User)
 @limiter.limit("5/minute")
-async def create_user(request: Request, user: schemas.UserCreate, db: AsyncSession = Depends(get_db)):
-    db_user = await crud.get_user_by_email(db, email=user.email)
-    if db_user:
+async def create_user(request: Request, user: schemas.UserCreate, db: deps.UnitOfWork):
+    db_user = await crud.create_user(db=db, user=user)
+    if db_user is None:
         raise HTTPException(status_code=400, detail="El email ya está registrado")
-    return await crud.create_user(db=db, user=user)
+    return db_user
 
 @app.post("/tasks/", response_model=schemas.Task)
 @limiter.limit("10/minute")
-async def create_task(request: Request, task: schemas.TaskCreate, db: AsyncSession = Depends(get_db), current_user: models.User = Depends(deps.get_current_user)):
+async def create_task(request: Request, task: schemas.TaskCreate, db: deps.UnitOfWork, current_user: schemas.Principal = Depends(deps.get_current_user)):
     """
     Crear una nueva tarea.
     """
     return await crud.create_task(db=db, task=task, user_id=current_user.id)
 
-@app.get("/tasks/", response_model=List[schemas.Task])
-async def read_tasks(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db), current_user: models.User = Depends(deps.get_current_user)):
+def _check_batch_size(size: int):
+    if size > settings.BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"El lote supera el máximo de {settings.BULK_MAX_ITEMS} elementos",
+        )
+
+@app.post("/tasks/bulk", response_model=schemas.BulkResult)
+@limiter.limit("10/minute")
+async def create_tasks_bulk(request: Request, payload: schemas.TaskBulkCreate, db: deps.UnitOfWork, current_user: schemas.Principal = Depends(deps.get_current_user)):
     """
-    Obtener lista de tareas con paginación.
+    Crear varias tareas en una sola transacción.
     """
-    # Nota: En una aplicación real, querríamos filtrar solo por el propietario
-    # tasks = await crud.get_tasks(db, skip=skip, limit=limit)
-    # Por ahora devolvemos todas, similar al estado anterior, pero se requiere autenticación
-    tasks = await crud.get_tasks(db, skip=skip, limit=limit)
-    return tasks
+    _check_batch_size(len(payload.items))
+    tasks = await crud.bulk_create_tasks(db, tasks=payload.items, user_id=current_user.id)
+    return schemas.BulkResult(results=[
+        schemas.BulkItemResult(index=index, id=task.id, ok=True, task=task) for index, task in enumerate(tasks)
+    ])
+
+@app.patch("/tasks/bulk", response_model=schemas.BulkResult)
+async def update_tasks_bulk(payload: schemas.TaskBulkUpdate, db: deps.UnitOfWork, current_user: schemas.Principal = Depends(deps.get_current_user)):
+    """
+    Actualizar varias tareas en una sola transacción, con un resultado por elemento.
+    """
+    _check_batch_size(len(payload.items))
+    updated = await crud.bulk_update_tasks(db, items=payload.items, user_id=current_user.id)
+    return schemas.BulkResult(results=[
+        schemas.BulkItemResult(index=index, id=item.id, ok=True, task=updated[item.id])
+        if item.id in updated else
+        schemas.BulkItemResult(index=index, id=item.id, ok=False, detail="Tarea no encontrada")
+        for index, item in enumerate(payload.items)
+    ])
+
+@app.delete("/tasks/bulk", response_model=schemas.BulkResult)
+async def delete_tasks_bulk(payload: schemas.TaskBulkDelete, db: deps.UnitOfWork, current_user: schemas.Principal = Depends(deps.get_current_user)):
+    """
+    Eliminar varias tareas en una sola transacción, con un resultado por elemento.
+    """
+    _check_batch_size(len(payload.ids))
+    deleted = await crud.bulk_delete_tasks(db, task_ids=payload.ids, user_id=current_user.id)
+    return schemas.BulkResult(results=[
+        schemas.BulkItemResult(index=index, id=task_id, ok=task_id in deleted, detail=None if task_id in deleted else "Tarea no encontrada")
+        for index, task_id in enumerate(payload.ids)
+    ])
+
+@app.get("/tasks/", response_model=Union[List[schemas.Task], schemas.TaskPage], response_class=FastJSONResponse)
+async def read_tasks(request: Request, filters: Annotated[schemas.TaskFilter, Depends()], skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=settings.PAGE_MAX_LIMIT), cursor: Optional[str] = None, if_none_match: Optional[str] = Header(None), reader: Reader = Depends(deps.get_reader), current_user: schemas.Principal = Depends(deps.get_current_user)):
+    """
+    Obtener las tareas del usuario actual.
+    Sin `cursor` se usa la paginación heredada skip/limit y se devuelve una lista.
+    `limit` va de 1 a PAGE_MAX_LIMIT.
+    Con `cursor` (vacío para la primera página) se usa paginación por cursor y se devuelve
+    `items` junto con `next_cursor` para pedir la siguiente página.
+    Se puede filtrar por `completed` y por rango de `created_after` / `created_before`,
+    y ordenar por fecha de creación con `order` (asc o desc).
+    Si `If-None-Match` coincide con la revisión actual responde 304 sin consultar las tareas.
+    El cuerpo se obtiene ya serializado (caché de tareas o proyección de columnas validada en lote).
+    """
+    # La revisión se lee antes que las tareas: el ETag nunca es más nuevo que los datos. También forma
+    # parte de la clave del caché: la generación del caché es por proceso (memory://) y se incrementa
+    # tras el commit, así que por sí sola podría servir un cuerpo antiguo con el ETag nuevo
+    revision = await reader.run(crud.get_tasks_revision, owner_id=current_user.id)
+    etag = etags.list_etag(current_user.id, revision, request.url.query)
+    if etags.etag_matches(if_none_match, etag):
+        return etags.not_modified(etag)
+    if cursor is None:
+        body = await reader.run(crud.get_tasks_json, owner_id=current_user.id, skip=skip, limit=limit, filters=filters,
+                                revision=revision)
+    else:
+        try:
+            body = await reader.run(crud.get_tasks_page_json, owner_id=current_user.id, limit=limit, cursor=cursor,
+                                    filters=filters, revision=revision)
+        except InvalidCursorError:
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+    response = FastJSONResponse(body)
+    etags.set_cache_headers(response, etag)
+    return response
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+async def _ndjson_lines(batches):
+    async for rows in batches:
+        yield "".join(json.dumps(dict(row), default=_json_default, ensure_ascii=False) + "\n" for row in rows)
+
+@app.get("/tasks/export")
+async def export_tasks(reader: Reader = Depends(deps.get_reader), current_user: schemas.Principal = Depends(deps.get_current_user)):
+    """
+    Exportar todas las tareas del usuario actual en formato NDJSON (una tarea JSON por línea).
+    La respuesta se transmite por partes desde un cursor del servidor, con memoria constante.
+    """
+    # Las filas se envían a medida que se leen: un fallo de la réplica a mitad del stream no se puede repetir
+    return StreamingResponse(
+        _ndjson_lines(crud.stream_tasks(reader.session, owner_id=current_user.id)),
+        media_type="application/x-ndjson",
+    )
+
+@app.get("/tasks/stats", response_model=schemas.TaskStats)
+async def read_task_stats(by_day: bool = False, days: int = Query(30, ge=1, le=366), reader: Reader = Depends(deps.get_reader), current_user: schemas.Principal = Depends(deps.get_current_user)):
+    """
+    Resumen de las tareas del usuario actual: total, completadas y pendientes, sin listarlas.
+    Con `by_day=true` incluye las tareas creadas por día (UTC) en los últimos `days` días (de 1 a 366).
+    """
+    return await reader.run(crud.get_task_stats, owner_id=current_user.id, by_day=by_day, days=days)
+
+@app.get("/tasks/search", response_model=schemas.TaskPage)
+async def search_tasks(q: str, limit: int = Query(50, ge=1, le=settings.PAGE_MAX_LIMIT), cursor: Optional[str] = None, reader: Reader = Depends(deps.get_reader), current_user: schemas.Principal = Depends(deps.get_current_user)):
+    """
+    Buscar texto en el título y la descripción de las tareas del usuario actual.
+    Devuelve las coincidencias de la más a la menos relevante (todas las palabras; la última
+    también como prefijo), paginadas con `next_cursor`.
+    """
+    try:
+        tasks, next_cursor = await reader.run(crud.search_tasks, owner_id=current_user.id, q=q, limit=limit, cursor=cursor)
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    return schemas.TaskPage(items=tasks, next_cursor=next_cursor)
+
+async def _sse_stream(events: EventBroker, user_id: int, last_event_id: Optional[str] = None):
+    # La suscripción se crea al empezar a enviar: si el cliente se desconecta antes, el generador
+    # nunca arranca y no queda ningún suscriptor sin cerrar
+    subscription = events.subscribe(user_id, last_event_id)
+    try:
+        # Tiempo de reconexión sugerido al navegador (ms)
+        yield "retry: 3000\n\n"
+        while True:
+            event = await subscription.get(timeout=settings.EVENTS_KEEPALIVE)
+            if event is CLOSED:
+                return
+            # Los comentarios SSE mantienen viva la conexión a través de proxies
+            yield ": keepalive\n\n" if event is None else event.sse()
+    finally:
+        subscription.close()
+
+@app.get("/tasks/events")
+async def task_events(
+    last_event_id: Optional[str] = Header(None),
+    last_event_id_param: Optional[str] = Query(None, alias="last_event_id"),
+    current_user: schemas.Principal = Depends(deps.get_stream_user),
+):
+    """
+    Cambios en las tareas del usuario actual en tiempo real (Server-Sent Events).
+    Cada evento (`created`, `updated`, `deleted`) incluye los IDs afectados y, salvo en los borrados,
+    las tareas. Al reconectar con `Last-Event-ID` se reenvían los eventos perdidos; si ya no están en
+    el historial se recibe `reset` y hay que recargar el listado.
+    """
+    return StreamingResponse(
+        _sse_stream(broker, current_user.id, last_event_id or last_event_id_param),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.websocket("/tasks/events/ws")
+async def task_events_ws(websocket: WebSocket, last_event_id: Optional[str] = None, current_user: schemas.Principal = Depends(deps.get_websocket_user)):
+    """
+    Variante WebSocket de /tasks/events (`?token=...&last_event_id=...`).
+    Cada mensaje es un JSON con `id`, `type` y `data`. Un cliente que no lee a tiempo se desconecta
+    con el código 1013 y debe reconectar con el último `id` recibido.
+    """
+    await websocket.accept()
+    subscription = broker.subscribe(current_user.id, last_event_id)
+
+    async def send_events():
+        while True:
+            event = await subscription.get(timeout=settings.EVENTS_KEEPALIVE)
+            if event is CLOSED:
+                await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+                return
+            if event is not None:
+                await websocket.send_text(event.ws())
+
+    async def receive_until_disconnect():
+        # Los mensajes del cliente se ignoran; solo interesa detectar el cierre
+        try:
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+
+    tasks = [asyncio.create_task(send_events()), asyncio.create_task(receive_until_disconnect())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        subscription.close()
 
 @app.get("/tasks/{task_id}", response_model=schemas.Task)
-async def read_task(task_id: int, db: AsyncSession = Depends(get_db), current_user: models.User = Depends(deps.get_current_user)):
+async def read_task(task_id: int, response: Response, if_none_match: Optional[str] = Header(None), reader: Reader = Depends(deps.get_reader), current_user: schemas.Principal = Depends(deps.get_current_user)):
     """
     Obtener una tarea específica por ID.
+    Responde 304 sin cuerpo si `If-None-Match` coincide con su versión actual.
     """
-    db_task = await crud.get_task(db, task_id=task_id)
+    db_task = await reader.run(crud.get_task_cached, task_id=task_id, owner_id=current_user.id)
     if db_task is None:
         raise HTTPException(status_code=404, detail="Tarea no encontrada")
+    etag = etags.task_etag(db_task)
+    if etags.etag_matches(if_none_match, etag):
+        return etags.not_modified(etag)
+    etags.set_cache_headers(response, etag)
     return db_task
 
 @app.put("/tasks/{task_id}", response_model=schemas.Task)
-async def update_task(task_id: int, task: schemas.TaskUpdate, db: AsyncSession = Depends(get_db), current_user: models.User = Depends(deps.get_current_user)):
+async def update_task(task_id: int, task: schemas.TaskUpdate, response: Response, db: deps.UnitOfWork, current_user: schemas.Principal = Depends(deps.get_current_user)):
     """
-    Actualizar una tarea.
+    Actualizar una tarea. La respuesta incluye el ETag de la nueva versión.
     """
-    db_task = await crud.update_task(db, task_id=task_id, task=task)
+    db_task = await crud.update_task(db, task_id=task_id, task=task, owner_id=current_user.id)
     if db_task is None:
         raise HTTPException(status_code=404, detail="Tarea no encontrada")
+    etags.set_cache_headers(response, etags.task_etag(db_task))
     return db_task
 
 @app.delete("/tasks/{task_id}")
-async def delete_task(task_id: int, db: AsyncSession = Depends(get_db), current_user: models.User = Depends(deps.get_current_user)):
+async def delete_task(task_id: int, db: deps.UnitOfWork, current_user: schemas.Principal = Depends(deps.get_current_user)):
     """
     Eliminar una tarea.
     """
-    db_task = await crud.delete_task(db, task_id=task_id)
-    if db_task is None:
+    deleted = await crud.delete_task(db, task_id=task_id, owner_id=current_user.id)
+    if not deleted:
         raise HTTPException(status_code=404, detail="Tarea no encontrada")
     return {"ok": True}
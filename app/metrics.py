@@ -0,0 +1,216 @@
+"""
+Author: Migbert Yanez
+GitHub: https://github.com/migbertweb
+License: GPL-3.0
+Description: Métricas en formato Prometheus (contadores, gauges e histogramas), middleware ASGI de instrumentación
+y registro de accesos muestreado. Incluye el tiempo de base de datos por petición mediante eventos de SQLAlchemy.
+"""
+import logging
+import random
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .database import settings
+
+logger = logging.getLogger("app.access")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names, values) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+class Metric:
+    """
+    Base de las métricas: nombre, descripción y etiquetas.
+    """
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def samples(self):
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, labelnames, labelvalues, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(labelnames, labelvalues)} {value}")
+        return "\n".join(lines)
+
+class Counter(Metric):
+    """
+    Contador monótono por combinación de etiquetas.
+    """
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labelvalues, amount: float = 1):
+        self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues) -> float:
+        return self._values.get(labelvalues, 0)
+
+    def samples(self):
+        for labelvalues, value in self._values.items():
+            yield "", self.labelnames, labelvalues, value
+
+class Gauge(Counter):
+    """
+    Valor que puede subir y bajar (p. ej. peticiones en curso).
+    """
+    kind = "gauge"
+
+    def dec(self, *labelvalues, amount: float = 1):
+        self.inc(*labelvalues, amount=-amount)
+
+    def set(self, *labelvalues, value: float):
+        self._values[labelvalues] = value
+
+class Histogram(Metric):
+    """
+    Histograma con cubetas acumulativas, suma y número de observaciones.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labelvalues):
+        series = self._series.get(labelvalues)
+        if series is None:
+            # [conteos por cubeta..., suma, total]
+            series = self._series[labelvalues] = [0] * len(self.buckets) + [0.0, 0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[index] += 1
+                break
+        series[-2] += value
+        series[-1] += 1
+
+    def count(self, *labelvalues) -> int:
+        series = self._series.get(labelvalues)
+        return series[-1] if series else 0
+
+    def samples(self):
+        bucket_labels = self.labelnames + ("le",)
+        for labelvalues, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield "_bucket", bucket_labels, labelvalues + (repr(bound),), cumulative
+            yield "_bucket", bucket_labels, labelvalues + ("+Inf",), series[-1]
+            yield "_sum", self.labelnames, labelvalues, round(series[-2], 6)
+            yield "_count", self.labelnames, labelvalues, series[-1]
+
+class Registry:
+    """
+    Conjunto de métricas que se exponen juntas en /metrics.
+    """
+    def __init__(self):
+        self._metrics: list[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self, extra: tuple = ()) -> str:
+        return "\n".join(metric.render() for metric in (*self._metrics, *extra)) + "\n"
+
+def gauges_from_stats(prefix: str, stats: dict) -> list:
+    """
+    Convierte un diccionario de estadísticas (p. ej. token_cache.stats()) en gauges sin etiquetas,
+    ignorando los valores no numéricos.
+    """
+    gauges = []
+    for key, value in stats.items():
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            gauge = Gauge(f"{prefix}_{key}", f"{prefix}: {key}.")
+            gauge.set(value=value)
+            gauges.append(gauge)
+    return gauges
+
+registry = Registry()
+
+REQUEST_DURATION = registry.register(Histogram(
+    "http_request_duration_seconds", "Duración de las peticiones HTTP por ruta.", ("method", "route")))
+REQUEST_DB_TIME = registry.register(Histogram(
+    "http_request_db_seconds", "Tiempo de base de datos consumido por petición.", ("method", "route")))
+REQUESTS_TOTAL = registry.register(Counter(
+    "http_requests_total", "Peticiones HTTP por ruta y código de estado.", ("method", "route", "status")))
+REQUESTS_IN_FLIGHT = registry.register(Gauge(
+    "http_requests_in_flight", "Peticiones HTTP en curso."))
+
+# Tiempo de base de datos acumulado por la petición actual (una lista de un elemento, mutable)
+_request_db_time: ContextVar[Optional[list]] = ContextVar("request_db_time", default=None)
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    accumulator = _request_db_time.get()
+    if accumulator is not None:
+        accumulator[0] += elapsed
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI puro: mide la latencia, el código de estado, las peticiones en curso y el
+    tiempo de base de datos de cada petición HTTP, y registra una muestra de los accesos.
+    """
+    def __init__(self, app, sample_rate: float = None):
+        self.app = app
+        self.sample_rate = settings.ACCESS_LOG_SAMPLE_RATE if sample_rate is None else sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        accumulator = [0.0]
+        token = _request_db_time.set(accumulator)
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            REQUESTS_IN_FLIGHT.dec()
+            _request_db_time.reset(token)
+            route = scope.get("route")
+            # Se usa la plantilla de la ruta (/tasks/{task_id}) para acotar la cardinalidad
+            route_path = getattr(route, "path", None) or "<unmatched>"
+            method = scope["method"]
+            REQUEST_DURATION.observe(duration, method, route_path)
+            REQUEST_DB_TIME.observe(accumulator[0], method, route_path)
+            REQUESTS_TOTAL.inc(method, route_path, status_code)
+            if status_code >= 500 or (self.sample_rate > 0 and random.random() < self.sample_rate):
+                logger.info(
+                    "method=%s route=%s path=%s status=%d duration_ms=%.2f db_ms=%.2f",
+                    method, route_path, scope["path"], status_code, duration * 1000, accumulator[0] * 1000,
+                )
@@ -0,0 +1,309 @@
+"""
+Author: Migbert Yanez
+GitHub: https://github.com/migbertweb
+License: GPL-3.0
+Description: Migraciones versionadas del esquema. Cada módulo de `versions/` (vNNNN_nombre.py) define una función
+upgrade(ctx); las aplicadas se registran en la tabla `schema_version`. Un bloqueo consultivo (advisory lock)
+garantiza que solo un proceso migra a la vez. En PostgreSQL los índices se crean con CREATE INDEX CONCURRENTLY
+y los rellenos de datos se hacen por lotes, sin bloquear la tabla `tasks` durante toda la migración.
+
+Uso:
+    python -m app.migrations            # aplica las migraciones pendientes
+    python -m app.migrations status     # muestra las aplicadas y las pendientes
+"""
+import functools
+import importlib
+import logging
+import pkgutil
+import re
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import Index, Table, func, insert, inspect, select, text
+from sqlalchemy.schema import CreateColumn, CreateIndex
+
+from .. import models
+from ..database import Base, settings
+
+logger = logging.getLogger("app.migrations")
+
+# Clave del bloqueo consultivo de PostgreSQL ("tasks" en ASCII) y nombre del de MySQL/MariaDB
+LOCK_KEY = 0x7461736B73
+LOCK_NAME = "task_api_migrations"
+
+MODULE_NAME = re.compile(r"v(\d{4})_(\w+)")
+
+class Migration:
+    """
+    Una migración: su versión y nombre (tomados del nombre del módulo) y la función upgrade(ctx).
+    Los índices concurrentes y los rellenos por lotes confirman por partes; como todas las operaciones
+    del contexto comprueban antes el estado, una migración interrumpida se puede repetir.
+    """
+    __slots__ = ("version", "name", "module")
+
+    def __init__(self, version: int, name: str, module):
+        self.version = version
+        self.name = name
+        self.module = module
+
+    def upgrade(self, ctx: "MigrationContext"):
+        self.module.upgrade(ctx)
+
+@functools.lru_cache
+def load_migrations() -> tuple[Migration, ...]:
+    """
+    Migraciones de `versions/` ordenadas por versión; las versiones deben ser consecutivas desde 1.
+    """
+    package = importlib.import_module(f"{__name__}.versions")
+    migrations = []
+    for info in pkgutil.iter_modules(package.__path__):
+        match = MODULE_NAME.fullmatch(info.name)
+        if match:
+            module = importlib.import_module(f"{package.__name__}.{info.name}")
+            migrations.append(Migration(int(match[1]), match[2], module))
+    migrations.sort(key=lambda migration: migration.version)
+    if [migration.version for migration in migrations] != list(range(1, len(migrations) + 1)):
+        raise RuntimeError("Las versiones de las migraciones deben ser consecutivas desde 1")
+    return tuple(migrations)
+
+def head() -> int:
+    """
+    Última versión disponible.
+    """
+    return load_migrations()[-1].version
+
+class MigrationContext:
+    """
+    Operaciones que usan las migraciones sobre una conexión síncrona (dentro de conn.run_sync()).
+    Todas comprueban antes el estado de la base de datos, de modo que repetirlas no tiene efecto.
+    """
+    def __init__(self, connection):
+        self.connection = connection
+        self.dialect = connection.dialect.name
+        self.preparer = connection.dialect.identifier_preparer
+
+    def execute(self, statement, params: Optional[dict] = None):
+        if isinstance(statement, str):
+            statement = text(statement)
+        return self.connection.execute(statement, params or {})
+
+    def commit(self):
+        self.connection.commit()
+
+    @contextmanager
+    def autocommit(self):
+        """
+        Ejecuta sin transacción (necesario para CREATE/DROP INDEX CONCURRENTLY en PostgreSQL).
+        """
+        self.commit()
+        self.connection.execution_options(isolation_level="AUTOCOMMIT")
+        try:
+            yield
+        finally:
+            self.connection.execution_options(isolation_level=self.connection.default_isolation_level)
+
+    def has_table(self, name: str) -> bool:
+        return inspect(self.connection).has_table(name)
+
+    def has_column(self, table: Table, name: str) -> bool:
+        return name in {column["name"] for column in inspect(self.connection).get_columns(table.name)}
+
+    def create_tables(self, *tables: Table):
+        """
+        Crea las tablas que falten (con sus índices y los DDL asociados a su creación).
+        """
+        Base.metadata.create_all(self.connection, tables=list(tables), checkfirst=True)
+
+    def add_column(self, table: Table, column):
+        """
+        Añade una columna si no existe. Con un valor por defecto constante es una operación solo de
+        catálogo en PostgreSQL 11+ y MySQL 8 (no reescribe la tabla); los valores calculados se rellenan
+        después con backfill().
+        """
+        if self.has_column(table, column.name):
+            return
+        ddl = CreateColumn(column).compile(dialect=self.connection.dialect)
+        self.execute(f"ALTER TABLE {self.preparer.format_table(table)} ADD COLUMN {ddl}")
+
+    def index_state(self, table_name: str, name: str) -> Optional[bool]:
+        """
+        None si el índice no existe; en PostgreSQL False si quedó inválido (un CREATE INDEX CONCURRENTLY interrumpido).
+        """
+        if self.dialect == "postgresql":
+            return self.execute(
+                "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE c.relname = :name AND pg_table_is_visible(c.oid)",
+                {"name": name},
+            ).scalar()
+        names = {index["name"] for index in inspect(self.connection).get_indexes(table_name)}
+        return True if name in names else None
+
+    def create_index(self, index: Index):
+        """
+        Crea un índice del modelo si no existe. En PostgreSQL lo hace con CONCURRENTLY, fuera de
+        transacción: la tabla sigue admitiendo escrituras mientras se construye.
+        """
+        table_name = index.table.name
+        state = self.index_state(table_name, index.name)
+        if state:
+            return
+        ddl = str(CreateIndex(index).compile(dialect=self.connection.dialect))
+        if self.dialect != "postgresql":
+            self.execute(ddl)
+            return
+        with self.autocommit():
+            if state is False:
+                self.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {self.preparer.quote(index.name)}")
+            self.execute(re.sub(r"^CREATE (UNIQUE )?INDEX", r"CREATE \1INDEX CONCURRENTLY", ddl))
+
+    def drop_index(self, table_name: str, name: str):
+        """
+        Elimina un índice si existe (en PostgreSQL con CONCURRENTLY).
+        """
+        if self.index_state(table_name, name) is None:
+            return
+        if self.dialect == "postgresql":
+            with self.autocommit():
+                self.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {self.preparer.quote(name)}")
+        elif self.dialect in ("mysql", "mariadb"):
+            self.execute(f"DROP INDEX {self.preparer.quote(name)} ON {self.preparer.quote(table_name)}")
+        else:
+            self.execute(f"DROP INDEX IF EXISTS {self.preparer.quote(name)}")
+
+    def backfill(self, statement: str, table: Table, key: str = "id", lock: Optional[str] = None,
+                 batch_size: Optional[int] = None) -> int:
+        """
+        Ejecuta `statement` por rangos consecutivos de la columna `key` de `table`, recibidos como
+        :lo (exclusivo) y :hi (inclusivo), con una transacción corta por lote. `lock` se ejecuta al
+        principio de cada lote (p. ej. un LOCK TABLE breve). Devuelve el número de lotes.
+        """
+        batch_size = batch_size or settings.MIGRATION_BATCH_SIZE
+        column = table.c[key]
+        self.commit()
+        lo = self.connection.execute(select(func.min(column))).scalar()
+        if lo is None:
+            return 0
+        lo -= 1
+        batches = 0
+        while True:
+            window = select(column).where(column > lo).order_by(column).limit(batch_size).subquery()
+            hi = self.connection.execute(select(func.max(window.c[key]))).scalar()
+            if hi is None:
+                break
+            if lock:
+                self.execute(lock)
+            self.execute(statement, {"lo": lo, "hi": hi})
+            self.commit()
+            batches += 1
+            lo = hi
+            logger.debug("Relleno de %s: lote %s hasta %s=%s", table.name, batches, key, hi)
+        return batches
+
+@contextmanager
+def migration_lock(connection):
+    """
+    Bloqueo consultivo de sesión: los demás procesos esperan aquí hasta que termine la migración en curso.
+    En SQLite no hace falta: app.serve migra una sola vez antes de lanzar los workers y la escritura ya es exclusiva.
+    """
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        acquire, release, params = "SELECT pg_advisory_lock(:key)", "SELECT pg_advisory_unlock(:key)", {"key": LOCK_KEY}
+    elif dialect in ("mysql", "mariadb"):
+        acquire, release, params = "SELECT GET_LOCK(:name, -1)", "SELECT RELEASE_LOCK(:name)", {"name": LOCK_NAME}
+    else:
+        yield
+        return
+    connection.execute(text(acquire), params)
+    connection.commit()
+    try:
+        yield
+    finally:
+        connection.rollback()
+        connection.execute(text(release), params)
+        connection.commit()
+
+def current_version(connection) -> Optional[int]:
+    """
+    Última versión aplicada, o None si la base de datos aún no tiene migraciones registradas.
+    """
+    if not inspect(connection).has_table(models.SchemaVersion.__tablename__):
+        return None
+    return connection.execute(select(func.max(models.SchemaVersion.version))).scalar()
+
+def applied_versions(connection) -> dict[int, Optional[datetime]]:
+    """
+    Versiones aplicadas y su fecha de aplicación.
+    """
+    if not inspect(connection).has_table(models.SchemaVersion.__tablename__):
+        return {}
+    table = models.SchemaVersion.__table__
+    if not MigrationContext(connection).has_column(table, "applied_at"):
+        return {version: None for version in connection.execute(select(table.c.version)).scalars()}
+    return dict(connection.execute(select(table.c.version, table.c.applied_at)).all())
+
+def ensure_version_table(ctx: MigrationContext):
+    """
+    Crea la tabla de versiones o completa la de una versión anterior (solo con la columna `version`).
+    """
+    table = models.SchemaVersion.__table__
+    if not ctx.has_table(table.name):
+        ctx.create_tables(table)
+    else:
+        ctx.add_column(table, table.c.name)
+        ctx.add_column(table, table.c.applied_at)
+    ctx.commit()
+
+def record(connection, migrations):
+    connection.execute(insert(models.SchemaVersion), [
+        {"version": migration.version, "name": migration.name, "applied_at": datetime.now(timezone.utc)}
+        for migration in migrations
+    ])
+
+def upgrade(connection, target: Optional[int] = None) -> list[int]:
+    """
+    Aplica las migraciones pendientes hasta `target` (por defecto la última) y devuelve las versiones aplicadas.
+    Con el esquema al día solo hace una consulta y no toma el bloqueo. Una base de datos vacía se crea
+    directamente con los modelos y se marca en la última versión.
+    Se ejecuta con conn.run_sync() sobre una conexión sin transacción abierta.
+    """
+    migrations = load_migrations()
+    target = target or head()
+    version = current_version(connection)
+    if version is not None and version >= target:
+        return []
+    connection.rollback()
+
+    with migration_lock(connection):
+        ctx = MigrationContext(connection)
+        # Otro proceso pudo migrar mientras se esperaba el bloqueo
+        applied = applied_versions(connection)
+        pending = [migration for migration in migrations if migration.version not in applied and migration.version <= target]
+        if not pending:
+            return []
+        ensure_version_table(ctx)
+
+        if not applied and target == head() and not ctx.has_table(models.User.__tablename__):
+            Base.metadata.create_all(connection)
+            record(connection, pending)
+            connection.commit()
+            logger.info("Esquema creado (versión %s)", target)
+            return [migration.version for migration in pending]
+
+        for migration in pending:
+            logger.info("Aplicando migración %04d_%s", migration.version, migration.name)
+            try:
+                migration.upgrade(ctx)
+                record(connection, [migration])
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+        return [migration.version for migration in pending]
+
+async def migrate(target_engine, target: Optional[int] = None) -> list[int]:
+    """
+    Aplica las migraciones pendientes con un motor asíncrono.
+    """
+    async with target_engine.connect() as conn:
+        return await conn.run_sync(upgrade, target)
@@ -0,0 +1,50 @@
+"""
+Author: Migbert Yanez
+GitHub: https://github.com/migbertweb
+License: GPL-3.0
+Description: Línea de comandos de las migraciones (python -m app.migrations [upgrade|status]).
+"""
+import argparse
+import asyncio
+import logging
+
+from . import applied_versions, load_migrations, migrate
+from ..database import create_engine_from_url, settings
+
+async def status(database_url: str):
+    engine = create_engine_from_url(database_url)
+    try:
+        async with engine.connect() as conn:
+            applied = await conn.run_sync(applied_versions)
+    finally:
+        await engine.dispose()
+    for migration in load_migrations():
+        if migration.version in applied:
+            state = f"aplicada {applied[migration.version] or ''}".rstrip()
+        else:
+            state = "pendiente"
+        print(f"{migration.version:04d}_{migration.name}: {state}")
+
+async def upgrade(database_url: str, target=None):
+    engine = create_engine_from_url(database_url)
+    try:
+        applied = await migrate(engine, target)
+    finally:
+        await engine.dispose()
+    print(f"Aplicadas: {', '.join(map(str, applied))}" if applied else "El esquema ya está al día")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migraciones del esquema de la base de datos")
+    parser.add_argument("command", nargs="?", choices=("upgrade", "status"), default="upgrade")
+    parser.add_argument("--target", type=int, help="versión hasta la que migrar (por defecto la última)")
+    parser.add_argument("--database-url", default=settings.DATABASE_URL)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "status":
+        asyncio.run(status(args.database_url))
+    else:
+        asyncio.run(upgrade(args.database_url, args.target))
+
+if __name__ == "__main__":
+    main()
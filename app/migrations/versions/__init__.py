@@ -0,0 +1,6 @@
+"""
+Author: Migbert Yanez
+GitHub: https://github.com/migbertweb
+License: GPL-3.0
+Description: Scripts de migración versionados (vNNNN_nombre.py, con una función upgrade(ctx)).
+"""
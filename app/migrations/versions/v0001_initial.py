@@ -0,0 +1,11 @@
+"""
+Author: Migbert Yanez
+GitHub: https://github.com/migbertweb
+License: GPL-3.0
+Description: Esquema inicial: tablas de usuarios y tareas. En las bases de datos creadas antes de las
+migraciones ya existen y no se tocan.
+"""
+from ... import models
+
+def upgrade(ctx):
+    ctx.create_tables(models.User.__table__, models.Task.__table__)
@@ -0,0 +1,13 @@
+"""
+Author: Migbert Yanez
+GitHub: https://github.com/migbertweb
+License: GPL-3.0
+Description: Índices del listado de tareas: (owner_id, created_at, id) para la paginación por cursor
+y el parcial de tareas pendientes. En PostgreSQL se construyen con CONCURRENTLY.
+"""
+from ... import models
+
+def upgrade(ctx):
+    indexes = {index.name: index for index in models.Task.__table__.indexes}
+    ctx.create_index(indexes["ix_tasks_owner_created_id"])
+    ctx.create_index(indexes["ix_tasks_owner_pending"])
@@ -0,0 +1,12 @@
+"""
+Author: Migbert Yanez
+GitHub: https://github.com/migbertweb
+License: GPL-3.0
+Description: Columnas de versión para los ETags: tasks.version y users.tasks_version. Tienen un valor
+por defecto constante, así que se añaden sin reescribir las tablas ni rellenarlas.
+"""
+from ... import models
+
+def upgrade(ctx):
+    ctx.add_column(models.Task.__table__, models.Task.__table__.c.version)
+    ctx.add_column(models.User.__table__, models.User.__table__.c.tasks_version)
@@ -0,0 +1,18 @@
+"""
+Author: Migbert Yanez
+GitHub: https://github.com/migbertweb
+License: GPL-3.0
+Description: Búsqueda de texto: sustituye el índice B-tree de tasks.description por el índice GIN del
+tsvector (PostgreSQL, con CONCURRENTLY) o por la tabla FTS5 con sus triggers (SQLite).
+"""
+from ... import models
+
+def upgrade(ctx):
+    ctx.drop_index("tasks", "ix_tasks_description")
+    if ctx.dialect == "postgresql":
+        search_index = next(index for index in models.Task.__table__.indexes if index.name == "ix_tasks_search")
+        ctx.create_index(search_index)
+    elif ctx.dialect == "sqlite":
+        # SQLite admite un único escritor: la tabla virtual se llena de una vez ('rebuild') en la misma transacción
+        for statement in models.SQLITE_FTS_DDL:
+            ctx.execute(statement)
@@ -0,0 +1,35 @@
+"""
+Author: Migbert Yanez
+GitHub: https://github.com/migbertweb
+License: GPL-3.0
+Description: Contadores de tareas por usuario (task_counters) y los triggers que los mantienen.
+En PostgreSQL los contadores de las tareas existentes se rellenan por lotes de propietarios.
+"""
+from sqlalchemy.schema import CreateTable
+
+from ... import models
+
+# Recalcula los contadores de un rango de propietarios. El LOCK TABLE breve de cada lote espera a las
+# escrituras en curso (cuyo trigger ya actualizó el contador) para que el recuento las incluya
+BATCH_LOCK = "LOCK TABLE tasks IN SHARE MODE"
+BATCH_BACKFILL = (
+    "INSERT INTO task_counters (owner_id, total, completed) "
+    "SELECT owner_id, count(*), sum(CASE WHEN completed THEN 1 ELSE 0 END) FROM tasks "
+    "WHERE owner_id > :lo AND owner_id <= :hi GROUP BY owner_id "
+    "ON CONFLICT (owner_id) DO UPDATE SET total = EXCLUDED.total, completed = EXCLUDED.completed"
+)
+
+def upgrade(ctx):
+    table = models.TaskCounter.__table__
+    if ctx.dialect != "postgresql":
+        # Crea la tabla, los triggers (SQLite) y el relleno inicial en una sola transacción
+        ctx.create_tables(table)
+        return
+    # CreateTable sin create_all: no dispara el relleno de una vez asociado a la creación de la tabla.
+    # La función y el trigger se reemplazan y el relleno sobrescribe, así que repetirla es seguro
+    if not ctx.has_table(table.name):
+        ctx.execute(CreateTable(table))
+    for statement in models.POSTGRESQL_COUNTER_DDL:
+        ctx.execute(statement)
+    ctx.commit()
+    ctx.backfill(BATCH_BACKFILL, models.Task.__table__, key="owner_id", lock=BATCH_LOCK)
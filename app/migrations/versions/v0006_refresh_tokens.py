@@ -0,0 +1,10 @@
+"""
+Author: Migbert Yanez
+GitHub: https://github.com/migbertweb
+License: GPL-3.0
+Description: Tokens de refresco y lista de revocación (refresh_tokens, revoked_tokens).
+"""
+from ... import models
+
+def upgrade(ctx):
+    ctx.create_tables(models.RefreshToken.__table__, models.RevokedToken.__table__)
@@ -0,0 +1,23 @@
+"""
+Author: Migbert Yanez
+GitHub: https://github.com/migbertweb
+License: GPL-3.0
+Description: Reescribe en SQLite las fechas de creación de las tareas en el formato que usa SQLAlchemy
+('YYYY-MM-DD HH:MM:SS.ffffff'). Las filas insertadas con CURRENT_TIMESTAMP (sin microsegundos) se comparan
+como texto con los cursores y quedaban fuera de la paginación por (created_at, id).
+"""
+from ... import models
+
+# Solo las filas que no tienen ya el formato canónico (26 caracteres); strftime también normaliza el
+# separador 'T' y los desplazamientos horarios (a UTC) de las fechas escritas a mano
+BATCH_BACKFILL = (
+    "UPDATE tasks SET created_at = strftime('%Y-%m-%d %H:%M:%f', created_at) || '000' "
+    "WHERE id > :lo AND id <= :hi AND length(created_at) <> 26 "
+    "AND strftime('%Y-%m-%d %H:%M:%f', created_at) IS NOT NULL"
+)
+
+def upgrade(ctx):
+    # Los demás motores guardan la columna como TIMESTAMP y comparan por valor
+    if ctx.dialect != "sqlite":
+        return
+    ctx.backfill(BATCH_BACKFILL, models.Task.__table__)
@@ -4,11 +4,31 @@ GitHub: https://github.com/migbertweb
 License: GPL-3.0
 Description: Modelos de base de datos SQLAlchemy que definen la estructura para las tablas de Usuarios y Tareas.
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index, DDL, event, false, text
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
+from sqlalchemy.sql.expression import FunctionElement
 from .database import Base
 
+class utc_now(FunctionElement):
+    """
+    Fecha actual del servidor para los valores por defecto. En SQLite se guarda con microsegundos y en el
+    mismo formato de texto que escribe SQLAlchemy ('YYYY-MM-DD HH:MM:SS.ffffff'): CURRENT_TIMESTAMP los
+    omite y esas filas quedarían mal ordenadas frente a los cursores, que se comparan como texto.
+    """
+    type = DateTime(timezone=True)
+    inherit_cache = True
+
+@compiles(utc_now)
+def _utc_now(element, compiler, **kw):
+    return compiler.process(func.now(), **kw)
+
+@compiles(utc_now, "sqlite")
+def _utc_now_sqlite(element, compiler, **kw):
+    return "(strftime('%Y-%m-%d %H:%M:%f000', 'now'))"
+
 class User(Base):
     """
     Modelo de usuario para la base de datos.
@@ -20,6 +40,9 @@ class User(Base):
     email = Column(String, unique=True, index=True)
     hashed_password = Column(String)
     is_active = Column(Boolean, default=True)
+    # Revisión de la colección de tareas del usuario: aumenta con cada alta, cambio o baja.
+    # Es la base del ETag del listado (max(Task.version) no detecta altas ni bajas)
+    tasks_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     tasks = relationship("Task", back_populates="owner")
 
@@ -32,10 +55,167 @@ class Task(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True)
-    description = Column(String, index=True)
+    # Sin índice B-tree: no sirve para buscar texto libre; la búsqueda usa FTS5 / tsvector (ver abajo)
+    description = Column(String)
     completed = Column(Boolean, default=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Los dos valores por defecto conservan los microsegundos en todos los motores (CURRENT_TIMESTAMP
+    # de SQLite los trunca), necesario para comparar cursores por (created_at, id)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), server_default=utc_now())
     owner_id = Column(Integer, ForeignKey("users.id"))
+    # Versión de la tarea, aumenta en cada actualización (ETag fuerte)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     owner = relationship("User", back_populates="tasks")
 
+    __table_args__ = (
+        # Listado por propietario ordenado por fecha (paginación por cursor)
+        Index("ix_tasks_owner_created_id", "owner_id", "created_at", "id"),
+        # Índice parcial de tareas pendientes (el filtro más habitual); solo donde se soporta.
+        # Las consultas deben comparar con el literal false() para que el planificador lo use
+        Index(
+            "ix_tasks_owner_pending", "owner_id", "created_at", "id",
+            postgresql_where=completed == false(),
+            sqlite_where=completed == false(),
+        ),
+    )
+
+def search_document():
+    """
+    Texto indexado para la búsqueda: título y descripción.
+    Solo usa literales (no parámetros) para que la consulta coincida exactamente con la
+    expresión del índice GIN de PostgreSQL.
+    """
+    # Literales con text(): un literal_column impediría al Index deducir su tabla
+    return func.to_tsvector(
+        text("'simple'"),
+        func.coalesce(Task.title, text("''")).op("||")(text("' '")).op("||")(func.coalesce(Task.description, text("''"))),
+    )
+
+# PostgreSQL: índice GIN sobre el tsvector del título y la descripción
+Index("ix_tasks_search", search_document(), postgresql_using="gin").ddl_if(dialect="postgresql")
+
+# SQLite: tabla FTS5 de contenido externo sincronizada con `tasks` mediante triggers.
+# El trigger de actualización solo se dispara si cambian el título o la descripción.
+SQLITE_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5("
+    "title, description, content='tasks', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS tasks_fts_au AFTER UPDATE OF title, description ON tasks BEGIN "
+    "INSERT INTO tasks_fts(tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    # Indexa las filas que ya existieran
+    "INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')",
+)
+for statement in SQLITE_FTS_DDL:
+    event.listen(Task.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(Task.__table__, "before_drop", DDL("DROP TABLE IF EXISTS tasks_fts").execute_if(dialect="sqlite"))
+
+class TaskCounter(Base):
+    """
+    Contadores de tareas por usuario (total y completadas) para GET /tasks/stats sin recorrer filas.
+    Los mantienen triggers de la base de datos, en la misma transacción que cada alta, cambio o baja.
+    """
+    __tablename__ = "task_counters"
+
+    owner_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    total = Column(Integer, nullable=False, default=0, server_default="0")
+    completed = Column(Integer, nullable=False, default=0, server_default="0")
+
+# Motores con triggers de contadores; en el resto /tasks/stats usa agregados sobre `tasks`
+TASK_COUNTER_DIALECTS = ("sqlite", "postgresql")
+
+# Los triggers se crean sobre `tasks`, que debe existir antes que la tabla de contadores
+TaskCounter.__table__.add_is_dependent_on(Task.__table__)
+
+SQLITE_COUNTER_DDL = (
+    "CREATE TRIGGER IF NOT EXISTS task_counters_ai AFTER INSERT ON tasks BEGIN "
+    "INSERT INTO task_counters (owner_id, total, completed) VALUES (new.owner_id, 1, coalesce(new.completed, 0)) "
+    "ON CONFLICT (owner_id) DO UPDATE SET total = total + 1, completed = completed + excluded.completed; END",
+    "CREATE TRIGGER IF NOT EXISTS task_counters_ad AFTER DELETE ON tasks BEGIN "
+    "UPDATE task_counters SET total = total - 1, completed = completed - coalesce(old.completed, 0) "
+    "WHERE owner_id = old.owner_id; END",
+    "CREATE TRIGGER IF NOT EXISTS task_counters_au AFTER UPDATE OF completed, owner_id ON tasks BEGIN "
+    "UPDATE task_counters SET total = total - 1, completed = completed - coalesce(old.completed, 0) "
+    "WHERE owner_id = old.owner_id; "
+    "INSERT INTO task_counters (owner_id, total, completed) VALUES (new.owner_id, 1, coalesce(new.completed, 0)) "
+    "ON CONFLICT (owner_id) DO UPDATE SET total = total + 1, completed = completed + excluded.completed; END",
+)
+POSTGRESQL_COUNTER_DDL = (
+    """
+    CREATE OR REPLACE FUNCTION task_counters_sync() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            UPDATE task_counters SET total = total - 1, completed = completed - COALESCE(OLD.completed, false)::int
+            WHERE owner_id = OLD.owner_id;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            INSERT INTO task_counters (owner_id, total, completed) VALUES (NEW.owner_id, 1, COALESCE(NEW.completed, false)::int)
+            ON CONFLICT (owner_id) DO UPDATE
+            SET total = task_counters.total + 1, completed = task_counters.completed + EXCLUDED.completed;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "CREATE OR REPLACE TRIGGER task_counters_sync AFTER INSERT OR DELETE OR UPDATE OF completed, owner_id ON tasks "
+    "FOR EACH ROW EXECUTE FUNCTION task_counters_sync()",
+)
+# Al crear la tabla de contadores se inicializa con las tareas que ya existieran
+COUNTER_BACKFILL = (
+    "INSERT INTO task_counters (owner_id, total, completed) "
+    "SELECT owner_id, count(*), sum(CASE WHEN completed THEN 1 ELSE 0 END) FROM tasks "
+    "WHERE owner_id IS NOT NULL GROUP BY owner_id"
+)
+for statement in SQLITE_COUNTER_DDL:
+    event.listen(TaskCounter.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+for statement in POSTGRESQL_COUNTER_DDL:
+    event.listen(TaskCounter.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+event.listen(TaskCounter.__table__, "after_create", DDL(COUNTER_BACKFILL).execute_if(dialect=TASK_COUNTER_DIALECTS))
+event.listen(
+    TaskCounter.__table__, "before_drop",
+    DDL("DROP FUNCTION IF EXISTS task_counters_sync() CASCADE").execute_if(dialect="postgresql"),
+)
+
+class RefreshToken(Base):
+    """
+    Token de refresco. Solo se guarda su hash SHA-256 (el token es aleatorio y largo, no necesita bcrypt).
+    Cada uso lo rota por uno nuevo de la misma familia (`family_id`, una por inicio de sesión);
+    presentar uno ya usado revela un robo y revoca la familia entera.
+    """
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True)
+    token_hash = Column(String(64), unique=True, nullable=False)
+    family_id = Column(String(32), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    used_at = Column(DateTime(timezone=True), nullable=True)
+    revoked_at = Column(DateTime(timezone=True), nullable=True)
+
+class RevokedToken(Base):
+    """
+    Identificador revocado antes de su expiración: el `jti` de un token de acceso o el `sid`
+    (familia de refresco) de una sesión cerrada. Se mantiene en memoria en cada proceso
+    (ver revocation.py) y se borra al expirar.
+    """
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(32), primary_key=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    # Marca de sincronización: cada proceso lee solo las revocaciones posteriores a la última vista
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False, index=True)
+
+class SchemaVersion(Base):
+    """
+    Migraciones aplicadas a la base de datos, una fila por versión (ver app/migrations).
+    Permite arrancar sin revisar todas las tablas cuando el esquema ya está al día.
+    """
+    __tablename__ = "schema_version"
+
+    version = Column(Integer, primary_key=True)
+    name = Column(String(100), nullable=True)
+    applied_at = Column(DateTime(timezone=True), nullable=True)
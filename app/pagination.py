@@ -0,0 +1,57 @@
+"""
+Author: Migbert Yanez
+GitHub: https://github.com/migbertweb
+License: GPL-3.0
+Description: Codificación de cursores opacos para la paginación por conjunto de claves (keyset).
+"""
+import base64
+import json
+from datetime import datetime
+
+class InvalidCursorError(ValueError):
+    """
+    El cursor recibido no es válido (manipulado o de otra versión de la API).
+    """
+    pass
+
+def encode_cursor(*values) -> str:
+    """
+    Codifica los valores de la última fila de una página en un cursor opaco (base64 URL-safe).
+    Las fechas se serializan en formato ISO 8601.
+    """
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """
+    Decodifica un cursor y comprueba que contiene `size` valores.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise InvalidCursorError(cursor)
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursorError(cursor)
+    return values
+
+def parse_datetime(value) -> datetime:
+    """
+    Convierte un valor ISO 8601 de un cursor en datetime.
+    """
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise InvalidCursorError(value)
+
+# Mayor entero con signo de 64 bits: un ID fuera de rango no se puede enlazar en la consulta
+MAX_ID = 2**63 - 1
+
+def parse_id(value) -> int:
+    """
+    Comprueba que el ID de un cursor es un entero positivo que cabe en la columna.
+    """
+    if isinstance(value, bool) or not isinstance(value, int) or not 0 < value <= MAX_ID:
+        raise InvalidCursorError(value)
+    return value
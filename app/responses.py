@@ -0,0 +1,22 @@
+"""
+Author: Migbert Yanez
+GitHub: https://github.com/migbertweb
+License: GPL-3.0
+Description: Clases de respuesta JSON rápidas para las rutas de lectura de tareas, serializadas con pydantic-core
+(Rust) en lugar de jsonable_encoder + json.dumps.
+"""
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+
+class FastJSONResponse(JSONResponse):
+    """
+    Respuesta JSON serializada con pydantic-core: admite modelos Pydantic, listas de modelos y fechas
+    sin convertirlos antes a diccionarios. Si el contenido ya son bytes JSON (p. ej. un listado
+    pre-serializado del caché) se envía tal cual, sin validar ni serializar.
+
+    Se elige por ruta: devolviéndola directamente o con `response_class=FastJSONResponse`.
+    """
+    def render(self, content) -> bytes:
+        if isinstance(content, (bytes, bytearray, memoryview)):
+            return bytes(content)
+        return to_json(content)
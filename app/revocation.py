@@ -0,0 +1,138 @@
+"""
+Author: Migbert Yanez
+GitHub: https://github.com/migbertweb
+License: GPL-3.0
+Description: Lista de revocación de tokens. Cada proceso guarda en memoria los identificadores revocados
+(`jti` de tokens de acceso y `sid` de sesiones cerradas) para comprobarlos en O(1) en cada petición,
+y la sincroniza periódicamente desde la tabla revoked_tokens para ver las revocaciones de otros procesos.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+from .database import after_commit
+
+logger = logging.getLogger("app.revocation")
+
+# Margen al releer revocaciones: una fila puede confirmarse algo después de su created_at
+SYNC_OVERLAP = timedelta(seconds=60)
+
+def as_utc(value: datetime) -> datetime:
+    """
+    SQLite devuelve las fechas sin zona horaria; se guardan siempre en UTC.
+    """
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+class Denylist:
+    """
+    Conjunto de identificadores revocados con su expiración. Solo contiene revocaciones aún
+    vigentes (como mucho la vida de un token de acceso), así que se mantiene pequeño.
+    """
+    def __init__(self):
+        self.checks = 0
+        self.rejected = 0
+        self._expires: dict[str, float] = {}
+        self._synced_until: Optional[datetime] = None
+
+    def __len__(self):
+        return len(self._expires)
+
+    def is_revoked(self, *identifiers: str) -> bool:
+        self.checks += 1
+        now = time.time()
+        for identifier in identifiers:
+            expires_at = self._expires.get(identifier)
+            if expires_at is not None and expires_at > now:
+                self.rejected += 1
+                return True
+        return False
+
+    def add(self, identifier: str, expires_at: datetime):
+        self._expires[identifier] = as_utc(expires_at).timestamp()
+
+    def prune(self):
+        now = time.time()
+        for identifier in [key for key, expires_at in self._expires.items() if expires_at <= now]:
+            del self._expires[identifier]
+
+    def clear(self):
+        self._expires.clear()
+        self._synced_until = None
+
+    async def revoke(self, db: AsyncSession, identifiers, expires_at: datetime):
+        """
+        Revoca identificadores hasta `expires_at`: se añaden a la sesión de base de datos (el llamador
+        hace commit) y, tras el commit, al conjunto local. Los demás procesos los ven en la siguiente
+        sincronización.
+        """
+        identifiers = [identifier for identifier in identifiers if identifier]
+        existing = set((await db.execute(
+            select(models.RevokedToken.jti).filter(models.RevokedToken.jti.in_(identifiers))
+        )).scalars().all()) if identifiers else set()
+        for identifier in identifiers:
+            if identifier not in existing:
+                db.add(models.RevokedToken(jti=identifier, expires_at=expires_at))
+
+        def add_local():
+            for identifier in identifiers:
+                self.add(identifier, expires_at)
+
+        after_commit(db, add_local)
+
+    async def sync(self, db: AsyncSession):
+        """
+        Carga las revocaciones vigentes creadas desde la última sincronización.
+        """
+        now = datetime.now(timezone.utc)
+        query = select(models.RevokedToken.jti, models.RevokedToken.expires_at, models.RevokedToken.created_at).filter(
+            models.RevokedToken.expires_at > now
+        )
+        if self._synced_until is not None:
+            # Se relee un margen hacia atrás para no perder transacciones lentas; repetir filas no tiene efecto
+            query = query.filter(models.RevokedToken.created_at >= self._synced_until - SYNC_OVERLAP)
+        for jti, expires_at, created_at in (await db.execute(query)).all():
+            self.add(jti, expires_at)
+            created_at = as_utc(created_at)
+            if self._synced_until is None or created_at > self._synced_until:
+                self._synced_until = created_at
+        self.prune()
+
+    async def purge_expired(self, db: AsyncSession):
+        """
+        Borra de la base de datos las revocaciones y los tokens de refresco ya expirados.
+        """
+        now = datetime.now(timezone.utc)
+        await db.execute(delete(models.RevokedToken).filter(models.RevokedToken.expires_at <= now))
+        await db.execute(delete(models.RefreshToken).filter(models.RefreshToken.expires_at <= now))
+        await db.commit()
+
+    async def load(self, session_factory):
+        """
+        Carga inicial al arrancar, antes de atender peticiones (la limpieza de lo expirado
+        se hace después, en segundo plano).
+        """
+        async with session_factory() as db:
+            await self.sync(db)
+
+    async def run(self, session_factory, interval: float):
+        """
+        Bucle de sincronización en segundo plano (se lanza en el lifespan de la aplicación).
+        """
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                async with session_factory() as db:
+                    await self.sync(db)
+            except Exception:
+                logger.exception("No se pudo sincronizar la lista de revocación")
+
+    def stats(self) -> dict:
+        return {"size": len(self._expires), "checks": self.checks, "rejected": self.rejected}
+
+denylist = Denylist()
@@ -4,9 +4,9 @@ GitHub: https://github.com/migbertweb
 License: GPL-3.0
 Description: Modelos Pydantic (esquemas) para validación de solicitudes y serialización de respuestas, incluyendo definiciones de Token, Usuario y Tarea.
 """
-from pydantic import BaseModel, EmailStr
-from datetime import datetime
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field, TypeAdapter, field_validator
+from datetime import date, datetime, timezone
+from typing import Literal, Optional
 
 class TaskBase(BaseModel):
     """
@@ -27,23 +27,121 @@ class TaskCreate(TaskBase):
 class TaskUpdate(TaskBase):
     """
     Esquema para actualizar una tarea existente.
-    Todos los campos son opcionales.
+    Todos los campos son opcionales, pero `title` y `completed` no admiten null explícito.
     """
     title: Optional[str] = None
     completed: Optional[bool] = None
 
+    @field_validator("title", "completed")
+    @classmethod
+    def not_null(cls, value):
+        # Los campos omitidos no se validan (valor por defecto); un null enviado se rechazaría
+        # después en la base de datos, que no los admite
+        if value is None:
+            raise ValueError("no puede ser null")
+        return value
+
 class Task(TaskBase):
     """
     Esquema completo de Tarea para respuestas (leídas desde DB).
-    Incluye ID, fecha de creación y ID del propietario.
+    Incluye ID, fecha de creación, ID del propietario y versión.
     """
     id: int
     created_at: datetime
     owner_id: int
+    version: int
 
     class Config:
         from_attributes = True
 
+class TaskPage(BaseModel):
+    """
+    Página de tareas para la paginación por cursor.
+    `next_cursor` es None cuando no hay más resultados.
+    """
+    items: list[Task]
+    next_cursor: Optional[str] = None
+
+class TaskFilter(BaseModel):
+    """
+    Filtros y orden del listado de tareas (parámetros de consulta de GET /tasks/).
+    `order` ordena por fecha de creación; las fechas sin zona horaria se interpretan en UTC.
+    """
+    completed: Optional[bool] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+    order: Optional[Literal["asc", "desc"]] = None
+
+    @field_validator("created_after", "created_before")
+    @classmethod
+    def to_utc(cls, value: Optional[datetime]) -> Optional[datetime]:
+        if value is None:
+            return None
+        return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+class TaskDayStats(BaseModel):
+    """
+    Tareas creadas en un día (UTC) y cuántas de ellas están completadas.
+    """
+    day: date
+    total: int
+    completed: int
+
+class TaskStats(BaseModel):
+    """
+    Resumen de las tareas del usuario por estado y, opcionalmente, por día de creación.
+    """
+    total: int
+    completed: int
+    pending: int
+    by_day: Optional[list[TaskDayStats]] = None
+
+# Adaptadores para validar filas y serializar a JSON en lote, sin pasar por jsonable_encoder
+TaskAdapter = TypeAdapter(Task)
+TaskListAdapter = TypeAdapter(list[Task])
+TaskPageAdapter = TypeAdapter(TaskPage)
+
+class TaskBulkCreate(BaseModel):
+    """
+    Esquema para crear varias tareas en una sola petición (al menos una).
+    """
+    items: list[TaskCreate] = Field(min_length=1)
+
+class TaskBulkUpdateItem(TaskUpdate):
+    """
+    Actualización parcial de una tarea dentro de un lote, identificada por su ID.
+    """
+    id: int
+
+class TaskBulkUpdate(BaseModel):
+    """
+    Esquema para actualizar varias tareas en una sola petición (al menos una).
+    """
+    items: list[TaskBulkUpdateItem] = Field(min_length=1)
+
+class TaskBulkDelete(BaseModel):
+    """
+    Esquema para eliminar varias tareas en una sola petición (al menos una).
+    """
+    ids: list[int] = Field(min_length=1)
+
+class BulkItemResult(BaseModel):
+    """
+    Resultado de un elemento de una operación por lotes.
+    `index` es la posición del elemento en la petición.
+    """
+    index: int
+    id: Optional[int] = None
+    ok: bool
+    detail: Optional[str] = None
+    task: Optional[Task] = None
+
+class BulkResult(BaseModel):
+    """
+    Resultado de una operación por lotes, con un elemento por cada elemento de la petición.
+    """
+    results: list[BulkItemResult]
+
 class UserBase(BaseModel):
     """
     Esquema base para Usuarios.
@@ -69,12 +167,33 @@ class User(UserBase):
     class Config:
         from_attributes = True
 
+class Principal(BaseModel):
+    """
+    Identidad mínima del usuario autenticado (sin relaciones).
+    Es lo que se cachea por token y lo que reciben las rutas protegidas.
+    """
+    id: int
+    email: str
+    is_active: bool
+
+    class Config:
+        from_attributes = True
+
 class Token(BaseModel):
     """
     Esquema para el Token de respuesta (JWT).
     """
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+    # Segundos de vida del token de acceso
+    expires_in: Optional[int] = None
+
+class RefreshRequest(BaseModel):
+    """
+    Esquema para renovar el token de acceso con un token de refresco.
+    """
+    refresh_token: str
 
 class TokenData(BaseModel):
     """
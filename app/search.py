@@ -0,0 +1,67 @@
+"""
+Author: Migbert Yanez
+GitHub: https://github.com/migbertweb
+License: GPL-3.0
+Description: Búsqueda de texto completo sobre el título y la descripción de las tareas: tsvector + GIN en PostgreSQL,
+FTS5 en SQLite y LIKE como alternativa en otros motores. Convierte el texto del usuario en términos seguros.
+"""
+import re
+
+from sqlalchemy import and_, column, func, literal, literal_column, or_, select, table, text
+
+from . import models
+
+# Palabras del texto de búsqueda; el resto de caracteres (comillas, operadores) se descarta
+TERM_RE = re.compile(r"\w+")
+MAX_TERMS = 16
+
+tasks_fts = table("tasks_fts", column("rowid"))
+
+def search_terms(q: str) -> list[str]:
+    """
+    Extrae los términos de búsqueda del texto del usuario (como mucho MAX_TERMS).
+    """
+    return TERM_RE.findall(q.lower())[:MAX_TERMS]
+
+def fts5_query(terms: list[str]) -> str:
+    """
+    Consulta FTS5: todos los términos entre comillas (sin operadores) y el último como prefijo.
+    """
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+def tsquery(terms: list[str]) -> str:
+    """
+    Consulta tsquery equivalente: todos los términos (&) y el último como prefijo.
+    """
+    return " & ".join(terms[:-1] + [f"{terms[-1]}:*"])
+
+def ranked_matches(dialect_name: str, columns, owner_id: int, terms: list[str]):
+    """
+    SELECT de las tareas del usuario que contienen todos los términos, con una columna `score`
+    (mayor es más relevante). `terms` no puede estar vacío.
+    """
+    owner = models.Task.owner_id == owner_id
+    if dialect_name == "postgresql":
+        document = models.search_document()
+        query = func.to_tsquery(text("'simple'"), tsquery(terms))
+        return select(*columns, func.ts_rank(document, query).label("score")).filter(owner, document.op("@@")(query))
+    if dialect_name == "sqlite":
+        # bm25() es menor cuanto más relevante; se invierte el signo
+        score = (-func.bm25(literal_column("tasks_fts"))).label("score")
+        return (
+            select(*columns, score)
+            .select_from(models.Task)
+            .join(tasks_fts, tasks_fts.c.rowid == models.Task.id)
+            .filter(owner, literal_column("tasks_fts").op("MATCH")(fts5_query(terms)))
+        )
+    # Otros motores (MySQL/MariaDB): subcadenas sin ranking
+    matches = [
+        or_(
+            func.lower(models.Task.title).contains(term, autoescape=True),
+            func.lower(models.Task.description).contains(term, autoescape=True),
+        )
+        for term in terms
+    ]
+    return select(*columns, literal(0.0).label("score")).filter(owner, and_(*matches))
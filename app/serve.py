@@ -0,0 +1,154 @@
+"""
+Author: Migbert Yanez
+GitHub: https://github.com/migbertweb
+License: GPL-3.0
+Description: Punto de entrada de producción (python -m app.serve). Lanza uvicorn con tantos workers como CPUs
+permita el contenedor (cuota de cgroup), aplica las migraciones una sola vez antes de lanzarlos, reparte entre ellos
+el presupuesto de conexiones a la base de datos y termina las peticiones en curso al recibir SIGTERM.
+"""
+import argparse
+import asyncio
+import importlib.util
+import logging
+import math
+import os
+from pathlib import Path
+from typing import Optional
+
+import uvicorn
+
+# Solo la configuración: importar app.database crearía los motores (y sus pools) antes de que
+# configure_workers() fije en el entorno el reparto de conexiones
+from .config import Settings
+
+settings = Settings()
+
+logger = logging.getLogger("app.serve")
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+
+def cgroup_cpu_limit(root: Path = CGROUP_ROOT) -> Optional[float]:
+    """
+    CPUs que permite la cuota del cgroup (v2: cpu.max, v1: cpu.cfs_quota_us), o None sin límite.
+    """
+    try:
+        quota, period = (root / "cpu.max").read_text().split()[:2]
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        quota = int((root / "cpu" / "cpu.cfs_quota_us").read_text())
+        period = int((root / "cpu" / "cpu.cfs_period_us").read_text())
+        return quota / period if quota > 0 and period > 0 else None
+    except (OSError, ValueError):
+        return None
+
+def available_cpus(root: Path = CGROUP_ROOT) -> int:
+    """
+    CPUs utilizables: las asignadas al proceso, limitadas por la cuota del cgroup (redondeada hacia arriba).
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    limit = cgroup_cpu_limit(root)
+    if limit is not None:
+        cpus = min(cpus, math.ceil(limit))
+    return max(1, cpus)
+
+def worker_count(requested: int = 0) -> int:
+    """
+    Número de workers: el pedido o, si es 0, uno por CPU disponible (la aplicación es asíncrona,
+    un proceso por núcleo basta para usarlos todos).
+    """
+    return requested if requested > 0 else available_cpus()
+
+def split_pool_budget(max_connections: int, workers: int, pool_size: int) -> tuple[int, int]:
+    """
+    Reparte un presupuesto total de conexiones entre los workers.
+    Devuelve (pool_size, max_overflow) por worker; cada worker tiene al menos una conexión.
+    """
+    per_worker = max(1, max_connections // workers)
+    size = max(1, min(pool_size, per_worker))
+    return size, per_worker - size
+
+def uvicorn_implementations() -> tuple[str, str]:
+    """
+    Bucle de eventos y parser HTTP: uvloop y httptools si están instalados (uvicorn[standard]).
+    """
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+    return loop, http
+
+def init_database():
+    """
+    Aplica las migraciones pendientes una sola vez, en el proceso padre y antes de lanzar los workers.
+    """
+    from . import migrations
+    from .database import create_engine_from_url
+
+    async def migrate():
+        engine = create_engine_from_url(settings.DATABASE_URL)
+        try:
+            await migrations.migrate(engine)
+        finally:
+            await engine.dispose()
+
+    asyncio.run(migrate())
+
+def configure_workers(workers: int):
+    """
+    Ajusta la configuración que heredan los workers a través del entorno. Debe llamarse antes de
+    importar app.database, que lee la configuración al crear los motores.
+    """
+    os.environ["DB_INIT_ON_STARTUP"] = "false"
+    if settings.DB_MAX_CONNECTIONS > 0:
+        pool_size, max_overflow = split_pool_budget(settings.DB_MAX_CONNECTIONS, workers, settings.DB_POOL_SIZE)
+        os.environ["DB_POOL_SIZE"] = str(pool_size)
+        os.environ["DB_MAX_OVERFLOW"] = str(max_overflow)
+        logger.info("Pool por worker: %s + %s de desbordamiento", pool_size, max_overflow)
+    if workers > 1:
+        # Estos componentes solo se coordinan dentro de un proceso con su backend en memoria
+        if settings.TASK_CACHE_URL.startswith("memory://") and settings.TASK_CACHE_TTL > 0:
+            logger.warning("TASK_CACHE_URL=memory:// con %s workers: las lecturas pueden quedar obsoletas hasta TASK_CACHE_TTL", workers)
+        if settings.EVENTS_BACKEND == "memory":
+            logger.warning("EVENTS_BACKEND=memory con %s workers: cada stream solo ve los cambios de su worker", workers)
+        if settings.RATE_LIMIT_STORAGE_URI.startswith("memory://"):
+            logger.warning("RATE_LIMIT_STORAGE_URI=memory:// con %s workers: el límite se aplica por worker", workers)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor de producción de la API de tareas")
+    parser.add_argument("--host", default=settings.HOST)
+    parser.add_argument("--port", type=int, default=settings.PORT)
+    parser.add_argument("--workers", type=int, default=settings.WEB_CONCURRENCY, help="0: una por CPU disponible")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    workers = worker_count(args.workers)
+    loop, http = uvicorn_implementations()
+    logger.info("Iniciando %s workers (loop=%s, http=%s)", workers, loop, http)
+
+    # Antes de cualquier importación de app.database: con un solo worker uvicorn carga app.main en
+    # este mismo proceso y reutiliza los motores ya creados
+    configure_workers(workers)
+    init_database()
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        # El registro de accesos lo hace el middleware de métricas (muestreado)
+        access_log=False,
+        # X-Forwarded-For lo interpreta la aplicación (TRUSTED_PROXY_HOPS, ver ratelimit.client_ip)
+        proxy_headers=False,
+        timeout_keep_alive=settings.KEEPALIVE_TIMEOUT,
+        # Tras SIGTERM se deja de aceptar conexiones y se esperan las peticiones en curso
+        timeout_graceful_shutdown=settings.SHUTDOWN_TIMEOUT,
+    )
+
+if __name__ == "__main__":
+    main()
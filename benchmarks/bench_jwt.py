@@ -0,0 +1,65 @@
+"""
+Author: Migbert Yanez
+GitHub: https://github.com/migbertweb
+License: GPL-3.0
+Description: Firmas y verificaciones de JWT por segundo según el algoritmo (HS256, ES256, RS256):
+- "raw": el secreto o el PEM se pasan a jose en cada llamada y se vuelven a analizar (ruta anterior)
+- "keyring": objetos de clave construidos una vez en el anillo de claves (app.keys)
+
+Uso:
+    python -m benchmarks.bench_jwt --iterations 2000
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from jose import jwt
+
+from app.keys import KeyRing, SigningKey
+
+def private_pem(key) -> bytes:
+    return key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+
+def public_pem(key) -> bytes:
+    return key.public_key().public_bytes(serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo)
+
+def per_second(iterations: int, func) -> float:
+    func()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return round(iterations / (time.perf_counter() - start), 1)
+
+def measure(algorithm: str, sign_key, verify_key, keyring: KeyRing, iterations: int) -> dict:
+    claims = {"sub": "bench@example.com", "exp": datetime.now(timezone.utc) + timedelta(hours=1)}
+    raw_token = jwt.encode(claims, sign_key, algorithm=algorithm)
+    token = keyring.encode(claims)
+    return {
+        "algorithm": algorithm,
+        "raw_sign_per_s": per_second(iterations, lambda: jwt.encode(claims, sign_key, algorithm=algorithm)),
+        "keyring_sign_per_s": per_second(iterations, lambda: keyring.encode(claims)),
+        "raw_verify_per_s": per_second(iterations, lambda: jwt.decode(raw_token, verify_key, algorithms=[algorithm])),
+        "keyring_verify_per_s": per_second(iterations, lambda: keyring.decode(token)),
+        "token_bytes": len(token),
+    }
+
+def main(args):
+    secret = "bench-secret-" + "x" * 32
+    ec_key = ec.generate_private_key(ec.SECP256R1())
+    rsa_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    cases = [
+        ("HS256", secret, secret, KeyRing.from_settings(SimpleNamespace(ALGORITHM="HS256", SECRET_KEY=secret))),
+        ("ES256", private_pem(ec_key), public_pem(ec_key), KeyRing(SigningKey.from_pem(private_pem(ec_key), "ES256"))),
+        ("RS256", private_pem(rsa_key), public_pem(rsa_key), KeyRing(SigningKey.from_pem(private_pem(rsa_key), "RS256"))),
+    ]
+    results = [measure(algorithm, sign_key, verify_key, keyring, args.iterations) for algorithm, sign_key, verify_key, keyring in cases]
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    main(parser.parse_args())
@@ -0,0 +1,75 @@
+"""
+Author: Migbert Yanez
+GitHub: https://github.com/migbertweb
+License: GPL-3.0
+Description: Mide la latencia (p50/p99) de GET /tasks/ mientras se ejecutan logins concurrentes,
+comparando bcrypt síncrono en el bucle de eventos ("inline") con el pool de hashing ("thread"/"process").
+
+Uso:
+    python -m benchmarks.bench_login_latency --logins 40 --concurrency 8
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from app import hashing
+from .common import bench_app, seed_user, login, summarize
+
+async def run_mode(mode: str, logins: int, concurrency: int, workers: int) -> dict:
+    """
+    Ejecuta el escenario con el modo de hashing indicado y devuelve el resumen de latencias.
+    """
+    previous = hashing.hasher
+    hashing.hasher = hashing.PasswordHasher(mode=mode, max_workers=workers, max_queue=logins)
+    try:
+        async with bench_app() as (client, session_factory):
+            await seed_user(session_factory, "reader@example.com", "readerpass", n_tasks=50)
+            await seed_user(session_factory, "login@example.com", "loginpass")
+            token = await login(client, "reader@example.com", "readerpass")
+            headers = {"Authorization": f"Bearer {token}"}
+            remaining = logins
+            done = asyncio.Event()
+
+            async def login_worker():
+                nonlocal remaining
+                while remaining > 0:
+                    remaining -= 1
+                    await login(client, "login@example.com", "loginpass")
+
+            async def probe():
+                latencies = []
+                while not done.is_set():
+                    start = time.perf_counter()
+                    response = await client.get("/tasks/", headers=headers)
+                    latencies.append(time.perf_counter() - start)
+                    response.raise_for_status()
+                    await asyncio.sleep(0.005)
+                return latencies
+
+            probe_task = asyncio.create_task(probe())
+            start = time.perf_counter()
+            await asyncio.gather(*(login_worker() for _ in range(concurrency)))
+            elapsed = time.perf_counter() - start
+            done.set()
+            latencies = await probe_task
+    finally:
+        hashing.hasher.shutdown()
+        hashing.hasher = previous
+    result = {"mode": mode, "logins": logins, "login_throughput_rps": round(logins / elapsed, 2)}
+    result.update({f"tasks_{k}": v for k, v in summarize(latencies).items()})
+    return result
+
+async def main(args):
+    results = []
+    for mode in args.modes:
+        results.append(await run_mode(mode, args.logins, args.concurrency, args.workers))
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--modes", nargs="+", default=["inline", "thread"], choices=["inline", "thread", "process"])
+    asyncio.run(main(parser.parse_args()))
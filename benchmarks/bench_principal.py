@@ -0,0 +1,51 @@
+"""
+Author: Migbert Yanez
+GitHub: https://github.com/migbertweb
+License: GPL-3.0
+Description: Mide latencia y pico de memoria de una petición autenticada (PUT /tasks/{id}) con el caché
+de tokens vacío, para usuarios con distinto número de tareas. Los valores deben mantenerse planos.
+
+Uso:
+    python -m benchmarks.bench_principal --task-counts 0 1000 10000 50000
+"""
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+
+from app import auth
+from app.cache import token_cache
+from .common import bench_app, seed_user, login, summarize
+
+async def measure(task_count: int, requests: int, hashed_password: str) -> dict:
+    async with bench_app() as (client, session_factory):
+        await seed_user(session_factory, "heavy@example.com", "heavypass", n_tasks=task_count, hashed_password=hashed_password)
+        token = await login(client, "heavy@example.com", "heavypass")
+        headers = {"Authorization": f"Bearer {token}"}
+        task_id = (await client.post("/tasks/", json={"title": "Medir"}, headers=headers)).json()["id"]
+        latencies = []
+        peak = 0
+        for _ in range(requests):
+            token_cache.clear()
+            tracemalloc.start()
+            start = time.perf_counter()
+            response = await client.put(f"/tasks/{task_id}", json={"completed": True}, headers=headers)
+            latencies.append(time.perf_counter() - start)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+            response.raise_for_status()
+    result = {"tasks": task_count, "peak_kib": round(peak / 1024, 1)}
+    result.update(summarize(latencies))
+    return result
+
+async def main(args):
+    hashed_password = auth.get_password_hash("heavypass")
+    results = [await measure(n, args.requests, hashed_password) for n in args.task_counts]
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--task-counts", type=int, nargs="+", default=[0, 1000, 10000, 50000])
+    parser.add_argument("--requests", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,83 @@
+"""
+Author: Migbert Yanez
+GitHub: https://github.com/migbertweb
+License: GPL-3.0
+Description: Compara el tiempo de CPU por petición de GET /tasks/ según la ruta de serialización:
+- "orm": entidades ORM -> schemas.Task (from_attributes) -> jsonable_encoder -> json.dumps (ruta anterior)
+- "columns": proyección de columnas validada en lote con un TypeAdapter -> JSON con pydantic-core
+- "cached": cuerpo JSON pre-serializado servido desde el caché de tareas
+Las dos primeras se miden aisladas (consulta + serialización); la última y "columns" también de extremo a
+extremo a través de la API (el cliente httpx corre en el mismo proceso y su CPU también cuenta).
+
+Uso:
+    python -m benchmarks.bench_serialization --rows 100 1000 --requests 200
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select
+
+from app import auth, crud, models, schemas
+from app.cache import task_cache
+from .common import bench_app, seed_user, login
+
+async def serialize_orm(session, owner_id: int, limit: int) -> bytes:
+    result = await session.execute(
+        select(models.Task).filter(models.Task.owner_id == owner_id).order_by(models.Task.id).limit(limit)
+    )
+    tasks = [schemas.Task.model_validate(task) for task in result.scalars().all()]
+    return json.dumps(jsonable_encoder(tasks)).encode()
+
+async def serialize_columns(session, owner_id: int, limit: int) -> bytes:
+    return schemas.TaskListAdapter.dump_json(await crud.get_tasks(session, owner_id, limit=limit))
+
+async def cpu_per_call(requests: int, func) -> float:
+    """
+    Tiempo de CPU medio (ms) de `func` tras una llamada de calentamiento.
+    """
+    await func()
+    start = time.process_time()
+    for _ in range(requests):
+        await func()
+    return round((time.process_time() - start) / requests * 1000, 3)
+
+async def measure(rows: int, requests: int, hashed_password: str) -> dict:
+    async with bench_app() as (client, session_factory):
+        owner_id = await seed_user(session_factory, "serial@example.com", "serialpass", n_tasks=rows, hashed_password=hashed_password)
+        result = {"rows": rows}
+        async with session_factory() as session:
+            for name, serializer in (("orm", serialize_orm), ("columns", serialize_columns)):
+                async def call():
+                    session.expunge_all()
+                    await serializer(session, owner_id, rows)
+                result[f"{name}_cpu_ms"] = await cpu_per_call(requests, call)
+
+        headers = {"Authorization": f"Bearer {await login(client, 'serial@example.com', 'serialpass')}"}
+
+        async def get_tasks():
+            response = await client.get("/tasks/", params={"limit": rows}, headers=headers)
+            response.raise_for_status()
+
+        ttl = task_cache.ttl
+        try:
+            task_cache.ttl = 0
+            result["api_columns_cpu_ms"] = await cpu_per_call(requests, get_tasks)
+            task_cache.ttl = ttl or 30
+            result["api_cached_cpu_ms"] = await cpu_per_call(requests, get_tasks)
+        finally:
+            task_cache.ttl = ttl
+    return result
+
+async def main(args):
+    hashed_password = auth.get_password_hash("serialpass")
+    results = [await measure(rows, args.requests, hashed_password) for rows in args.rows]
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--requests", type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
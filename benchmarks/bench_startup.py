@@ -0,0 +1,76 @@
+"""
+Author: Migbert Yanez
+GitHub: https://github.com/migbertweb
+License: GPL-3.0
+Description: Tiempo de arranque en frío, cada medición en un proceso nuevo: `import app.main`, el lifespan
+(comprobación del esquema) y la latencia de la primera petición autenticada. Escenarios:
+- "fresh": base de datos vacía (se crea el esquema)
+- "existing": base de datos ya creada (solo se comprueba la versión de las migraciones)
+- "no_init": DB_INIT_ON_STARTUP=false (las migraciones las aplica app.serve o python -m app.migrations)
+
+Uso:
+    python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Se ejecuta en un intérprete nuevo para medir imports en frío
+CHILD = """
+import asyncio, json, time
+start = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+
+async def main():
+    from httpx import ASGITransport, AsyncClient
+    async with app.router.lifespan_context(app):
+        started = time.perf_counter()
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+            response = await client.get("/tasks/", headers={"Authorization": "Bearer x.y.z"})
+            assert response.status_code == 401, response.status_code
+        first = time.perf_counter()
+    print(json.dumps({
+        "import_ms": (imported - start) * 1000,
+        "startup_ms": (started - imported) * 1000,
+        "first_request_ms": (first - started) * 1000,
+    }))
+
+asyncio.run(main())
+"""
+
+def run_child(database_url: str, init: bool) -> dict:
+    env = dict(os.environ, DATABASE_URL=database_url, DB_INIT_ON_STARTUP=str(init).lower())
+    result = subprocess.run([sys.executable, "-c", CHILD], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def summarize(samples: list[dict]) -> dict:
+    return {key: round(statistics.median(sample[key] for sample in samples), 1) for key in samples[0]}
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        def fresh_url(index: int) -> str:
+            return f"sqlite+aiosqlite:///{tmp}/fresh-{index}.db"
+
+        existing_url = args.database_url or f"sqlite+aiosqlite:///{tmp}/existing.db"
+        # Calentamiento: bytecode compilado y base de datos "existing" creada
+        run_child(existing_url, init=True)
+        results = {
+            "fresh": summarize([run_child(fresh_url(index), init=True) for index in range(args.runs)]),
+            "existing": summarize([run_child(existing_url, init=True) for _ in range(args.runs)]),
+            "no_init": summarize([run_child(existing_url, init=False) for _ in range(args.runs)]),
+        }
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--database-url", help="base de datos ya creada para los escenarios existing/no_init")
+    main(parser.parse_args())
@@ -0,0 +1,113 @@
+"""
+Author: Migbert Yanez
+GitHub: https://github.com/migbertweb
+License: GPL-3.0
+Description: Utilidades compartidas por los benchmarks: base de datos temporal, cliente ASGI en proceso, siembra de datos y cálculo de percentiles.
+"""
+import math
+import os
+import tempfile
+from contextlib import asynccontextmanager, contextmanager
+
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+
+from app.main import app
+from app.database import Base, get_db, get_async_url
+from app.cache import task_cache
+from app import auth, models
+
+def percentile(values, pct: float) -> float:
+    """
+    Percentil por el método del rango más cercano (values no necesita estar ordenado).
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+def summarize(latencies) -> dict:
+    """
+    Resume una lista de latencias (segundos) en milisegundos.
+    """
+    return {
+        "count": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(max(latencies, default=0) * 1000, 3),
+    }
+
+async def prepare_database(database_url: str):
+    """
+    Crea un motor y una fábrica de sesiones sobre `database_url` con el esquema recién creado.
+    """
+    engine = create_async_engine(get_async_url(database_url))
+    session_factory = async_sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    return engine, session_factory
+
+@contextmanager
+def database_url_or_temp(database_url: str = None):
+    """
+    Devuelve `database_url` o, si es None, la URL de un archivo SQLite temporal.
+    """
+    if database_url is not None:
+        yield database_url
+        return
+    with tempfile.TemporaryDirectory() as tmpdir:
+        yield f"sqlite+aiosqlite:///{os.path.join(tmpdir, 'bench.db')}"
+
+@asynccontextmanager
+async def bench_app(database_url: str = None):
+    """
+    Levanta la aplicación en proceso sobre una base de datos propia (SQLite temporal por defecto)
+    y devuelve (cliente httpx, fábrica de sesiones). Desactiva el rate limiting y vacía el caché
+    de tareas (los IDs se repiten entre bases de datos de distintas ejecuciones).
+    """
+    with database_url_or_temp(database_url) as url:
+        engine, session_factory = await prepare_database(url)
+
+        async def override_get_db():
+            async with session_factory() as session:
+                yield session
+
+        app.dependency_overrides[get_db] = override_get_db
+        app.state.limiter.enabled = False
+        task_cache.clear()
+        try:
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+                yield client, session_factory
+        finally:
+            app.dependency_overrides.clear()
+            app.state.limiter.enabled = True
+            await engine.dispose()
+
+async def seed_user(session_factory, email: str, password: str, n_tasks: int = 0, hashed_password: str = None) -> int:
+    """
+    Crea un usuario con n_tasks tareas y devuelve su ID.
+    Permite reutilizar un hash ya calculado para no pagar bcrypt por cada usuario sembrado.
+    """
+    async with session_factory() as session:
+        user = models.User(email=email, hashed_password=hashed_password or auth.get_password_hash(password))
+        session.add(user)
+        await session.flush()
+        user_id = user.id
+        if n_tasks:
+            await session.execute(
+                models.Task.__table__.insert(),
+                [{"title": f"Tarea {i}", "description": f"Descripción {i}", "owner_id": user_id} for i in range(n_tasks)],
+            )
+        await session.commit()
+        return user_id
+
+async def login(client, email: str, password: str) -> str:
+    """
+    Obtiene un token de acceso para el usuario indicado.
+    """
+    response = await client.post("/token", data={"username": email, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
@@ -6,7 +6,7 @@ from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sess
 from sqlalchemy.pool import StaticPool
 
 from app.main import app
-from app.database import Base, get_db
+from app.database import Base, get_db, rollback
 
 # Usar SQLite en memoria para tests
 DATABASE_URL = "sqlite+aiosqlite:///:memory:"
@@ -34,7 +34,9 @@ async def db_session():
 @pytest_asyncio.fixture()
 async def client(db_session):
     async def override_get_db():
+        # Como get_db: lo que la petición no haya confirmado se descarta al terminar
         yield db_session
+        await rollback(db_session)
     
     app.dependency_overrides[get_db] = override_get_db
     # Desactivar rate limiting para los tests
@@ -43,3 +45,21 @@ async def client(db_session):
         yield ac
     app.dependency_overrides.clear()
     app.state.limiter.enabled = True
+
+@pytest_asyncio.fixture()
+async def heavy_user(db_session):
+    """
+    Siembra un usuario con muchas tareas (por defecto 5000) para verificar que la
+    autenticación no depende del número de tareas. Devuelve (email, password).
+    """
+    from app import auth, models
+    email, password = "heavy@example.com", "heavypassword"
+    user = models.User(email=email, hashed_password=auth.get_password_hash(password))
+    db_session.add(user)
+    await db_session.flush()
+    await db_session.execute(
+        models.Task.__table__.insert(),
+        [{"title": f"Tarea {i}", "description": "x" * 200, "owner_id": user.id} for i in range(5000)],
+    )
+    await db_session.commit()
+    return email, password
@@ -51,3 +51,91 @@ async def test_login_missing_fields(client):
     )
     # FastAPI devolverá 422 si falta un campo requerido en el form
     assert response.status_code == 422
+
+@pytest.mark.asyncio
+async def test_token_cache_skips_lookup_on_repeated_requests(client):
+    from app.cache import token_cache
+    email = "cache@example.com"
+    password = "cachepassword"
+    await client.post("/users/", json={"email": email, "password": password})
+    response = await client.post("/token", data={"username": email, "password": password})
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    await client.get("/tasks/", headers=headers)
+    hits = token_cache.hits
+    await client.get("/tasks/", headers=headers)
+    assert token_cache.hits == hits + 1
+
+    stats = (await client.get("/stats")).json()["token_cache"]
+    assert stats["hits"] >= 1
+
+@pytest.mark.asyncio
+async def test_deactivated_user_loses_cached_access(client, db_session):
+    from app import crud
+    from app.database import commit
+    email = "inactive@example.com"
+    password = "inactivepassword"
+    user = (await client.post("/users/", json={"email": email, "password": password})).json()
+    response = await client.post("/token", data={"username": email, "password": password})
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    assert (await client.get("/tasks/", headers=headers)).status_code == 200
+
+    await crud.set_user_active(db_session, user["id"], False)
+    # crud solo hace flush: el commit (y la invalidación del caché de tokens) es de quien llama
+    await commit(db_session)
+    response = await client.get("/tasks/", headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Usuario inactivo"
+
+async def login(client, email, password):
+    await client.post("/users/", json={"email": email, "password": password})
+    return (await client.post("/token", data={"username": email, "password": password})).json()
+
+@pytest.mark.asyncio
+async def test_refresh_token_rotation_and_reuse_detection(client):
+    tokens = await login(client, "refresh@example.com", "refreshpassword")
+    assert tokens["refresh_token"] and tokens["expires_in"] == 30 * 60
+
+    response = await client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 200
+    renewed = response.json()
+    assert renewed["refresh_token"] != tokens["refresh_token"]
+    headers = {"Authorization": f"Bearer {renewed['access_token']}"}
+    assert (await client.get("/tasks/", headers=headers)).status_code == 200
+
+    # Reutilizar el token ya canjeado revoca toda la sesión
+    assert (await client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})).status_code == 401
+    assert (await client.post("/token/refresh", json={"refresh_token": renewed["refresh_token"]})).status_code == 401
+    assert (await client.get("/tasks/", headers=headers)).status_code == 401
+
+@pytest.mark.asyncio
+async def test_logout_revokes_cached_access_token_and_refresh_token(client):
+    tokens = await login(client, "logout@example.com", "logoutpassword")
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    other = (await client.post("/token", data={"username": "logout@example.com", "password": "logoutpassword"})).json()
+    other_headers = {"Authorization": f"Bearer {other['access_token']}"}
+    assert (await client.get("/tasks/", headers=headers)).status_code == 200
+
+    assert (await client.post("/logout", headers=headers)).json() == {"ok": True}
+    assert (await client.get("/tasks/", headers=headers)).status_code == 401
+    assert (await client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})).status_code == 401
+    # La otra sesión sigue abierta hasta cerrar todas
+    assert (await client.get("/tasks/", headers=other_headers)).status_code == 200
+    assert (await client.post("/logout", params={"all_sessions": True}, headers=other_headers)).status_code == 200
+    assert (await client.get("/tasks/", headers=other_headers)).status_code == 401
+
+@pytest.mark.asyncio
+async def test_denylist_syncs_revocations_from_other_processes(db_session):
+    from datetime import datetime, timedelta, timezone
+    from app import models
+    from app.revocation import Denylist
+
+    denylist = Denylist()
+    await denylist.sync(db_session)
+    db_session.add(models.RevokedToken(jti="otro-proceso", expires_at=datetime.now(timezone.utc) + timedelta(minutes=5)))
+    db_session.add(models.RevokedToken(jti="expirado", expires_at=datetime.now(timezone.utc) - timedelta(minutes=5)))
+    await db_session.commit()
+
+    await denylist.sync(db_session)
+    assert denylist.is_revoked("otro-proceso")
+    assert not denylist.is_revoked("expirado")
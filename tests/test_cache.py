@@ -0,0 +1,106 @@
+import asyncio
+import pytest
+from pydantic import TypeAdapter
+
+from app.cache import MemoryBackend, ReadThroughCache, task_cache
+
+adapter = TypeAdapter(list[int])
+
+def make_cache():
+    return ReadThroughCache(MemoryBackend(maxsize=100, ttl=60), ttl=60)
+
+@pytest.mark.asyncio
+async def test_single_flight_coalesces_concurrent_misses():
+    cache = make_cache()
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return [1, 2, 3]
+
+    results = await asyncio.gather(*(cache.get_list(1, ("p",), loader, adapter) for _ in range(10)))
+    assert all(result == [1, 2, 3] for result in results)
+    assert calls == 1
+    assert cache.stats()["shared_loads"] == 9
+
+    assert await cache.get_list(1, ("p",), loader, adapter) == [1, 2, 3]
+    assert calls == 1
+    assert cache.stats()["hits"] == 1
+
+@pytest.mark.asyncio
+async def test_invalidation_is_per_owner_and_per_item():
+    cache = make_cache()
+    version = {"value": 1}
+
+    async def loader():
+        return [version["value"]]
+
+    await cache.get_list(1, ("p",), loader, adapter)
+    await cache.get_list(2, ("p",), loader, adapter)
+    await cache.get_item(1, 10, loader, adapter)
+    await cache.get_item(1, 11, loader, adapter)
+    version["value"] = 2
+
+    await cache.invalidate(1, [10])
+    assert await cache.get_list(1, ("p",), loader, adapter) == [2]
+    assert await cache.get_list(2, ("p",), loader, adapter) == [1]
+    assert await cache.get_item(1, 10, loader, adapter) == [2]
+    assert await cache.get_item(1, 11, loader, adapter) == [1]
+
+@pytest.mark.asyncio
+async def test_item_loaded_during_a_write_is_not_cached():
+    cache = make_cache()
+
+    async def racing_loader():
+        # Una escritura termina mientras se carga el valor antiguo
+        await cache.invalidate(1, [10])
+        return ["antiguo"]
+
+    assert await cache.get_item(1, 10, racing_loader, adapter) == ["antiguo"]
+
+    async def loader():
+        return ["nuevo"]
+
+    assert await cache.get_item(1, 10, loader, adapter) == ["nuevo"]
+
+@pytest.mark.asyncio
+async def test_api_reads_are_invalidated_by_writes(client):
+    await client.post("/users/", json={"email": "cache@example.com", "password": "cachepassword"})
+    response = await client.post("/token", data={"username": "cache@example.com", "password": "cachepassword"})
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    task_id = (await client.post("/tasks/", json={"title": "Cacheada"}, headers=headers)).json()["id"]
+
+    assert len((await client.get("/tasks/", headers=headers)).json()) == 1
+    assert (await client.get(f"/tasks/{task_id}", headers=headers)).json()["completed"] is False
+
+    await client.put(f"/tasks/{task_id}", json={"completed": True}, headers=headers)
+    assert (await client.get(f"/tasks/{task_id}", headers=headers)).json()["completed"] is True
+    assert (await client.get("/tasks/", headers=headers)).json()[0]["completed"] is True
+
+    await client.post("/tasks/", json={"title": "Otra"}, headers=headers)
+    assert len((await client.get("/tasks/", headers=headers)).json()) == 2
+
+    await client.delete(f"/tasks/{task_id}", headers=headers)
+    assert (await client.get(f"/tasks/{task_id}", headers=headers)).status_code == 404
+    assert len((await client.get("/tasks/", headers=headers)).json()) == 1
+
+@pytest.mark.asyncio
+async def test_list_body_follows_the_etag_revision(client, monkeypatch):
+    await client.post("/users/", json={"email": "revision@example.com", "password": "revisionpassword"})
+    response = await client.post("/token", data={"username": "revision@example.com", "password": "revisionpassword"})
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    first = await client.get("/tasks/", headers=headers)
+    assert first.json() == []
+
+    # Simula otro worker (memory://) o la ventana entre el commit y la invalidación: la generación
+    # del caché no cambia, pero la revisión sí
+    async def skip_invalidation(owner_id, item_ids=()):
+        pass
+
+    monkeypatch.setattr(task_cache, "invalidate", skip_invalidation)
+    await client.post("/tasks/", json={"title": "Nueva"}, headers=headers)
+    second = await client.get("/tasks/", headers=headers)
+    assert second.headers["etag"] != first.headers["etag"]
+    assert [task["title"] for task in second.json()] == ["Nueva"]
@@ -0,0 +1,80 @@
+import json
+import pytest
+
+from app.events import CLOSED, EventBroker, broker
+from app.main import _sse_stream
+
+@pytest.mark.asyncio
+async def test_events_fan_out_per_user():
+    events = EventBroker(queue_size=10, history_size=10)
+    first, second, other = events.subscribe(1), events.subscribe(1), events.subscribe(2)
+
+    await events.publish(1, "deleted", [5])
+    for subscription in (first, second):
+        event = await subscription.get(timeout=1)
+        assert event.type == "deleted"
+        assert json.loads(event.data) == {"type": "deleted", "ids": [5]}
+    assert await other.get(timeout=0.01) is None
+
+@pytest.mark.asyncio
+async def test_slow_consumer_is_dropped_and_resumes_from_history():
+    events = EventBroker(queue_size=2, history_size=10)
+    slow = events.subscribe(1)
+    for task_id in range(3):
+        await events.publish(1, "deleted", [task_id])
+
+    assert await slow.get(timeout=1) is CLOSED
+    assert events.stats() == {"subscribers": 0, "published": 3, "dropped_consumers": 1}
+
+    # Al reconectar con el último ID recibido se reenvía lo posterior
+    history = list(events._history[1])
+    resumed = events.subscribe(1, last_event_id=history[0].id)
+    assert [(await resumed.get(timeout=1)).id for _ in range(2)] == [event.id for event in history[1:]]
+
+@pytest.mark.asyncio
+async def test_unknown_last_event_id_sends_reset():
+    events = EventBroker(queue_size=10, history_size=10)
+    subscription = events.subscribe(1, last_event_id="desconocido")
+    assert (await subscription.get(timeout=1)).type == "reset"
+
+@pytest.mark.asyncio
+async def test_sse_stream_frames_and_unsubscribes():
+    events = EventBroker(queue_size=10, history_size=10)
+    await events.publish(1, "deleted", [6])
+    await events.publish(1, "deleted", [7])
+    last_event_id = events._history[1][0].id
+
+    stream = _sse_stream(events, 1, last_event_id)
+    # Sin iterar no hay suscripción (cliente desconectado antes de empezar la respuesta)
+    assert events.stats()["subscribers"] == 0
+    assert await anext(stream) == "retry: 3000\n\n"
+    assert events.stats()["subscribers"] == 1
+    frame = await anext(stream)
+    assert frame.startswith("id: ") and "event: deleted\n" in frame and "7" in frame
+    await stream.aclose()
+    assert events.stats()["subscribers"] == 0
+
+@pytest.mark.asyncio
+async def test_task_writes_publish_events(client):
+    user = (await client.post("/users/", json={"email": "events@example.com", "password": "eventspassword"})).json()
+    response = await client.post("/token", data={"username": "events@example.com", "password": "eventspassword"})
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    subscription = broker.subscribe(user["id"])
+    try:
+        task_id = (await client.post("/tasks/", json={"title": "En vivo"}, headers=headers)).json()["id"]
+        await client.put(f"/tasks/{task_id}", json={"completed": True}, headers=headers)
+        await client.delete(f"/tasks/{task_id}", headers=headers)
+
+        created, updated, deleted = [await subscription.get(timeout=1) for _ in range(3)]
+        assert created.type == "created"
+        assert json.loads(created.data)["tasks"][0]["title"] == "En vivo"
+        assert updated.type == "updated"
+        assert json.loads(updated.data)["tasks"][0]["completed"] is True
+        assert (deleted.type, json.loads(deleted.data)["ids"]) == ("deleted", [task_id])
+    finally:
+        subscription.close()
+
+@pytest.mark.asyncio
+async def test_events_require_authentication(client):
+    assert (await client.get("/tasks/events")).status_code == 401
+    assert (await client.get("/tasks/events", params={"token": "invalido"})).status_code == 401
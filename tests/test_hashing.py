@@ -0,0 +1,43 @@
+import asyncio
+import pytest
+
+from app import hashing
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_in_pool():
+    hasher = hashing.PasswordHasher(mode="thread", max_workers=1, max_queue=1)
+    try:
+        hashed = await hasher.run(hashing.auth.get_password_hash, "secreto")
+        assert await hasher.run(hashing.auth.verify_password, "secreto", hashed)
+        assert not await hasher.run(hashing.auth.verify_password, "otro", hashed)
+        assert hasher.pending == 0
+    finally:
+        hasher.shutdown()
+
+@pytest.mark.asyncio
+async def test_pool_sheds_load_when_queue_is_full():
+    hasher = hashing.PasswordHasher(mode="thread", max_workers=1, max_queue=0)
+    try:
+        first = asyncio.create_task(hasher.run(hashing.auth.get_password_hash, "uno"))
+        await asyncio.sleep(0)
+        with pytest.raises(hashing.HashingOverloadedError):
+            await hasher.run(hashing.auth.get_password_hash, "dos")
+        await first
+    finally:
+        hasher.shutdown()
+
+@pytest.mark.asyncio
+async def test_login_returns_503_when_hashing_is_saturated(client, monkeypatch):
+    await client.post("/users/", json={"email": "busy@example.com", "password": "busypassword"})
+
+    async def overloaded(*args):
+        raise hashing.HashingOverloadedError()
+
+    monkeypatch.setattr(hashing, "verify_password", overloaded)
+    response = await client.post(
+        "/token",
+        data={"username": "busy@example.com", "password": "busypassword"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"}
+    )
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
@@ -0,0 +1,51 @@
+from types import SimpleNamespace
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+from app.keys import InvalidTokenError, KeyRing
+
+def write_ec_key(path):
+    key = ec.generate_private_key(ec.SECP256R1())
+    path.write_bytes(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()))
+    return str(path)
+
+def make_keyring(private_key_file, public_key_files=""):
+    config = SimpleNamespace(
+        ALGORITHM="ES256",
+        SECRET_KEY="",
+        JWT_PRIVATE_KEY_FILE=private_key_file,
+        JWT_PUBLIC_KEY_FILES=public_key_files,
+    )
+    return KeyRing.from_settings(config)
+
+def test_rotation_keeps_tokens_of_retired_keys_valid(tmp_path):
+    old_key, new_key = write_ec_key(tmp_path / "old.pem"), write_ec_key(tmp_path / "new.pem")
+    before = make_keyring(old_key)
+    token = before.encode({"sub": "rotacion@example.com"})
+
+    after = make_keyring(new_key, public_key_files=old_key)
+    assert after.decode(token)["sub"] == "rotacion@example.com"
+    assert after.decode(after.encode({"sub": "nuevo"}))["sub"] == "nuevo"
+    kids = {key["kid"] for key in after.jwks()["keys"]}
+    assert kids == {before.active.kid, after.active.kid}
+    assert all("d" not in key and key["alg"] == "ES256" for key in after.jwks()["keys"])
+
+    # Retirada definitiva de la clave antigua
+    with pytest.raises(InvalidTokenError):
+        make_keyring(new_key).decode(token)
+
+def test_hs256_tokens_without_kid():
+    keyring = KeyRing.from_settings(SimpleNamespace(ALGORITHM="HS256", SECRET_KEY="secreto"))
+    token = keyring.encode({"sub": "hs@example.com"})
+    assert keyring.decode(token)["sub"] == "hs@example.com"
+    assert keyring.jwks() == {"keys": []}
+    with pytest.raises(InvalidTokenError):
+        KeyRing.from_settings(SimpleNamespace(ALGORITHM="HS256", SECRET_KEY="otro")).decode(token)
+
+@pytest.mark.asyncio
+async def test_jwks_endpoint(client):
+    response = await client.get("/.well-known/jwks.json")
+    assert response.status_code == 200
+    assert "keys" in response.json()
@@ -0,0 +1,32 @@
+import pytest
+
+from app import metrics
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram("demo_seconds", "Demo.", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5, "/a")
+    text = histogram.render()
+    assert 'demo_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{route="/a",le="1.0"} 2' in text
+    assert 'demo_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{route="/a"} 3' in text
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_records_routes_and_db_time(client):
+    await client.post("/users/", json={"email": "metrics@example.com", "password": "metricspassword"})
+    before_db = metrics.REQUEST_DB_TIME.count("POST", "/users/")
+    await client.post("/users/", json={"email": "metrics2@example.com", "password": "metricspassword"})
+    await client.get("/no-existe")
+
+    assert metrics.REQUEST_DB_TIME.count("POST", "/users/") == before_db + 1
+    assert metrics.REQUESTS_TOTAL.value("GET", "<unmatched>", 404) >= 1
+    assert metrics.REQUEST_DB_TIME._series[("POST", "/users/")][-2] > 0
+
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_requests_total{method="POST",route="/users/",status="200"}' in response.text
+    assert "http_requests_in_flight" in response.text
+    assert "token_cache_hits" in response.text
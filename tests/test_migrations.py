@@ -0,0 +1,121 @@
+import pytest
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud, database, migrations, models, schemas
+
+# Esquema de la versión inicial de la aplicación, anterior a las migraciones
+LEGACY_SCHEMA = (
+    "CREATE TABLE users (id INTEGER PRIMARY KEY, email VARCHAR, hashed_password VARCHAR, is_active BOOLEAN)",
+    "CREATE UNIQUE INDEX ix_users_email ON users (email)",
+    "CREATE TABLE tasks (id INTEGER PRIMARY KEY, title VARCHAR, description VARCHAR, completed BOOLEAN, "
+    "created_at DATETIME DEFAULT CURRENT_TIMESTAMP, owner_id INTEGER REFERENCES users (id))",
+    "CREATE INDEX ix_tasks_title ON tasks (title)",
+    "CREATE INDEX ix_tasks_description ON tasks (description)",
+    "INSERT INTO users (id, email, hashed_password, is_active) VALUES (1, 'a@example.com', 'x', 1), (2, 'b@example.com', 'x', 1)",
+    "INSERT INTO tasks (title, description, completed, owner_id) VALUES "
+    "('Comprar pan', 'panadería', 1, 1), ('Llamar', NULL, 0, 1), ('Informe anual', 'finanzas', 0, 2)",
+)
+
+def schema(connection):
+    inspector = inspect(connection)
+    return {
+        "tables": set(inspector.get_table_names()),
+        "task_columns": {column["name"] for column in inspector.get_columns("tasks")},
+        "user_columns": {column["name"] for column in inspector.get_columns("users")},
+        "task_indexes": {index["name"] for index in inspector.get_indexes("tasks")},
+    }
+
+@pytest.mark.asyncio
+async def test_fresh_database_is_created_at_head(tmp_path):
+    engine = database.create_engine_from_url(f"sqlite+aiosqlite:///{tmp_path / 'fresh.db'}")
+    try:
+        assert await migrations.migrate(engine) == list(range(1, migrations.head() + 1))
+        # Con el esquema al día no se aplica nada
+        assert await migrations.migrate(engine) == []
+        async with engine.connect() as conn:
+            assert await conn.run_sync(migrations.current_version) == migrations.head()
+    finally:
+        await engine.dispose()
+
+@pytest.mark.asyncio
+async def test_legacy_database_is_upgraded_in_place(tmp_path):
+    engine = database.create_engine_from_url(f"sqlite+aiosqlite:///{tmp_path / 'legacy.db'}")
+    try:
+        async with engine.begin() as conn:
+            for statement in LEGACY_SCHEMA:
+                await conn.execute(text(statement))
+
+        assert await migrations.migrate(engine, target=1) == [1]
+        assert await migrations.migrate(engine) == list(range(2, migrations.head() + 1))
+
+        async with engine.connect() as conn:
+            current = await conn.run_sync(schema)
+            assert {"task_counters", "tasks_fts", "refresh_tokens", "revoked_tokens"} <= current["tables"]
+            assert "version" in current["task_columns"] and "tasks_version" in current["user_columns"]
+            assert {"ix_tasks_owner_created_id", "ix_tasks_owner_pending"} <= current["task_indexes"]
+            assert "ix_tasks_description" not in current["task_indexes"]
+            # Las filas existentes quedan indexadas y contadas
+            counters = (await conn.execute(text("SELECT owner_id, total, completed FROM task_counters ORDER BY owner_id"))).all()
+            assert [tuple(row) for row in counters] == [(1, 2, 1), (2, 1, 0)]
+            matches = (await conn.execute(text("SELECT rowid FROM tasks_fts WHERE tasks_fts MATCH 'panaderia'"))).scalars().all()
+            assert matches == [1]
+            assert (await conn.execute(text("SELECT version FROM tasks WHERE id = 1"))).scalar() == 1
+    finally:
+        await engine.dispose()
+
+@pytest.mark.asyncio
+async def test_backfill_runs_in_key_range_batches(tmp_path):
+    engine = database.create_engine_from_url(f"sqlite+aiosqlite:///{tmp_path / 'backfill.db'}")
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(database.Base.metadata.create_all)
+            await conn.execute(text("INSERT INTO users (id, email) VALUES (1, 'a@example.com')"))
+            await conn.execute(
+                models.Task.__table__.insert(),
+                [{"title": f"Tarea {i}", "owner_id": 1} for i in range(7)],
+            )
+
+        def backfill(connection):
+            ctx = migrations.MigrationContext(connection)
+            return ctx.backfill(
+                "UPDATE tasks SET version = version + 1 WHERE id > :lo AND id <= :hi",
+                models.Task.__table__, batch_size=3,
+            )
+
+        async with engine.connect() as conn:
+            assert await conn.run_sync(backfill) == 3
+            versions = (await conn.execute(text("SELECT DISTINCT version FROM tasks"))).scalars().all()
+            assert versions == [2]
+    finally:
+        await engine.dispose()
+
+@pytest.mark.asyncio
+async def test_legacy_created_at_is_canonical_and_pageable(tmp_path):
+    engine = database.create_engine_from_url(f"sqlite+aiosqlite:///{tmp_path / 'created_at.db'}")
+    try:
+        async with engine.begin() as conn:
+            for statement in LEGACY_SCHEMA:
+                await conn.execute(text(statement))
+            # Filas con CURRENT_TIMESTAMP (sin microsegundos) creadas en el mismo segundo
+            await conn.execute(text("UPDATE tasks SET created_at = '2024-01-01 10:00:00', owner_id = 1"))
+            await conn.execute(text("INSERT INTO tasks (title, completed, owner_id) VALUES ('Nueva', 0, 1)"))
+        await migrations.migrate(engine)
+
+        async with engine.connect() as conn:
+            lengths = (await conn.execute(text("SELECT DISTINCT length(created_at) FROM tasks"))).scalars().all()
+            assert lengths == [26]
+
+        async with AsyncSession(engine) as db:
+            for order in ("desc", "asc"):
+                seen, cursor = [], None
+                while True:
+                    tasks, cursor = await crud.get_tasks_page(
+                        db, owner_id=1, limit=1, cursor=cursor, filters=schemas.TaskFilter(order=order),
+                    )
+                    seen += [task.id for task in tasks]
+                    if cursor is None:
+                        break
+                assert sorted(seen) == [1, 2, 3, 4] and len(seen) == 4
+    finally:
+        await engine.dispose()
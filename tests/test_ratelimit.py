@@ -0,0 +1,36 @@
+from limits import RateLimitItemPerMinute
+from limits.storage import storage_from_string
+from limits.strategies import SlidingWindowCounterRateLimiter
+from starlette.requests import Request
+
+from app import ratelimit
+
+def make_request(forwarded=None, client="10.0.0.1"):
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "headers": headers, "client": (client, 1234)})
+
+def test_sqlite_storage_is_shared_between_workers(tmp_path):
+    uri = f"sqlite:///{tmp_path / 'ratelimit.db'}"
+    # Dos instancias sobre el mismo archivo simulan dos workers
+    worker_a = SlidingWindowCounterRateLimiter(storage_from_string(uri))
+    worker_b = SlidingWindowCounterRateLimiter(storage_from_string(uri))
+    limit = RateLimitItemPerMinute(3)
+
+    assert worker_a.hit(limit, "1.2.3.4")
+    assert worker_b.hit(limit, "1.2.3.4")
+    assert worker_a.hit(limit, "1.2.3.4")
+    assert not worker_b.hit(limit, "1.2.3.4")
+    assert worker_b.hit(limit, "5.6.7.8")
+    assert worker_a.get_window_stats(limit, "1.2.3.4").remaining == 0
+
+def test_client_ip_respects_trusted_proxy_hops(monkeypatch):
+    monkeypatch.setattr(ratelimit.settings, "TRUSTED_PROXY_HOPS", 0)
+    assert ratelimit.client_ip(make_request("1.1.1.1")) == "10.0.0.1"
+
+    monkeypatch.setattr(ratelimit.settings, "TRUSTED_PROXY_HOPS", 1)
+    # El cliente puede falsificar entradas a la izquierda; solo cuenta la añadida por el proxy
+    assert ratelimit.client_ip(make_request("6.6.6.6, 2.2.2.2")) == "2.2.2.2"
+    assert ratelimit.client_ip(make_request()) == "10.0.0.1"
+
+    monkeypatch.setattr(ratelimit.settings, "TRUSTED_PROXY_HOPS", 2)
+    assert ratelimit.client_ip(make_request("6.6.6.6, 2.2.2.2, 172.16.0.1")) == "2.2.2.2"
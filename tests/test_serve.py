@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from app.serve import available_cpus, cgroup_cpu_limit, split_pool_budget, worker_count
+
+def test_cgroup_v2_quota(tmp_path):
+    (tmp_path / "cpu.max").write_text("150000 100000\n")
+    assert cgroup_cpu_limit(tmp_path) == 1.5
+    assert available_cpus(tmp_path) <= 2
+
+    (tmp_path / "cpu.max").write_text("max 100000\n")
+    assert cgroup_cpu_limit(tmp_path) is None
+
+def test_cgroup_v1_quota(tmp_path):
+    (tmp_path / "cpu").mkdir()
+    (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("-1\n")
+    (tmp_path / "cpu" / "cpu.cfs_period_us").write_text("100000\n")
+    assert cgroup_cpu_limit(tmp_path) is None
+
+    (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("50000\n")
+    assert cgroup_cpu_limit(tmp_path) == 0.5
+    assert available_cpus(tmp_path) == 1
+
+def test_worker_count_and_pool_budget():
+    assert worker_count(3) == 3
+    assert worker_count(0) >= 1
+    # 20 conexiones entre 4 workers con DB_POOL_SIZE=3: 3 fijas + 2 de desbordamiento cada uno
+    assert split_pool_budget(20, 4, 3) == (3, 2)
+    assert split_pool_budget(20, 4, 10) == (5, 0)
+    # Siempre al menos una conexión por worker
+    assert split_pool_budget(2, 8, 5) == (1, 0)
+
+def test_single_worker_gets_the_pool_split(tmp_path):
+    # En un proceso nuevo: con un solo worker uvicorn carga app.main en el proceso del lanzador
+    script = (
+        "import sys, uvicorn\n"
+        "from app import serve\n"
+        "assert 'app.database' not in sys.modules\n"
+        "def run(target, **options):\n"
+        "    from app.database import engine, settings\n"
+        "    print(options['workers'], settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW, settings.DB_INIT_ON_STARTUP, engine.pool.size())\n"
+        "uvicorn.run = run\n"
+        "serve.main(['--workers', '1'])\n"
+    )
+    env = os.environ | {
+        "DATABASE_URL": f"sqlite+aiosqlite:///{tmp_path / 'serve.db'}",
+        "DB_MAX_CONNECTIONS": "3",
+        "DB_POOL_SIZE": "5",
+        "DB_MAX_OVERFLOW": "10",
+        "DB_INIT_ON_STARTUP": "true",
+    }
+    root = Path(__file__).resolve().parent.parent
+    result = subprocess.run([sys.executable, "-c", script], cwd=root, env=env, capture_output=True, text=True, check=True)
+    assert result.stdout.split() == ["1", "3", "0", "False", "3"]
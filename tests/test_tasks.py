@@ -1,4 +1,5 @@
 import pytest
+from app.pagination import encode_cursor
 
 async def get_token(client, email, password):
     response = await client.post(
@@ -86,3 +87,388 @@ async def test_delete_task(client):
 async def test_unauthorized_access(client):
     response = await client.get("/tasks/")
     assert response.status_code == 401
+
+@pytest.mark.asyncio
+async def test_read_tasks_cursor_pagination(client):
+    email = "cursor@example.com"
+    password = "cursorpassword"
+    await client.post("/users/", json={"email": email, "password": password})
+    token = await get_token(client, email, password)
+    headers = {"Authorization": f"Bearer {token}"}
+    created = [
+        (await client.post("/tasks/", json={"title": f"Task {i}"}, headers=headers)).json()["id"]
+        for i in range(5)
+    ]
+
+    seen = []
+    cursor = ""
+    while cursor is not None:
+        response = await client.get("/tasks/", params={"cursor": cursor, "limit": 2}, headers=headers)
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page["items"]) <= 2
+        seen.extend(task["id"] for task in page["items"])
+        cursor = page["next_cursor"]
+    # De la más reciente a la más antigua, sin duplicados y solo las del propietario
+    assert seen == list(reversed(created))
+
+    response = await client.get("/tasks/", params={"cursor": "no-es-un-cursor"}, headers=headers)
+    assert response.status_code == 400
+    # Un ID que no cabe en la columna es un cursor inválido, no un error del servidor
+    response = await client.get("/tasks/", params={"cursor": encode_cursor("2024-01-01T00:00:00", 10**30)}, headers=headers)
+    assert response.status_code == 400
+
+    for limit in (0, -1, 10**6):
+        for params in ({"cursor": "", "limit": limit}, {"limit": limit}):
+            assert (await client.get("/tasks/", params=params, headers=headers)).status_code == 422
+
+@pytest.mark.asyncio
+async def test_read_tasks_only_returns_own_tasks(client):
+    for email in ("owner1@example.com", "owner2@example.com"):
+        await client.post("/users/", json={"email": email, "password": "ownerpassword"})
+    headers1 = {"Authorization": f"Bearer {await get_token(client, 'owner1@example.com', 'ownerpassword')}"}
+    headers2 = {"Authorization": f"Bearer {await get_token(client, 'owner2@example.com', 'ownerpassword')}"}
+    await client.post("/tasks/", json={"title": "Privada"}, headers=headers1)
+
+    response = await client.get("/tasks/", headers=headers2)
+    assert response.status_code == 200
+    assert response.json() == []
+
+@pytest.mark.asyncio
+async def test_export_tasks_ndjson(client):
+    import json
+    email = "export@example.com"
+    password = "exportpassword"
+    await client.post("/users/", json={"email": email, "password": password})
+    token = await get_token(client, email, password)
+    headers = {"Authorization": f"Bearer {token}"}
+    for i in range(3):
+        await client.post("/tasks/", json={"title": f"Export {i}", "description": "ñ"}, headers=headers)
+
+    response = await client.get("/tasks/export", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["title"] for row in rows] == ["Export 0", "Export 1", "Export 2"]
+    assert rows[0]["description"] == "ñ"
+    assert set(rows[0]) == {"id", "title", "description", "completed", "created_at", "owner_id"}
+
+@pytest.mark.asyncio
+async def test_bulk_create_update_delete(client):
+    email = "bulk@example.com"
+    password = "bulkpassword"
+    await client.post("/users/", json={"email": email, "password": password})
+    token = await get_token(client, email, password)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    response = await client.post(
+        "/tasks/bulk",
+        json={"items": [{"title": f"Bulk {i}"} for i in range(3)]},
+        headers=headers
+    )
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["task"]["title"] for r in results] == ["Bulk 0", "Bulk 1", "Bulk 2"]
+    ids = [r["id"] for r in results]
+
+    response = await client.patch(
+        "/tasks/bulk",
+        json={"items": [
+            {"id": ids[0], "completed": True},
+            {"id": ids[1], "title": "Renombrada"},
+            {"id": 999999, "completed": True},
+        ]},
+        headers=headers
+    )
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert results[0]["ok"] and results[0]["task"]["completed"] is True
+    assert results[1]["ok"] and results[1]["task"]["title"] == "Renombrada"
+    assert results[2] == {"index": 2, "id": 999999, "ok": False, "detail": "Tarea no encontrada", "task": None}
+
+    response = await client.request("DELETE", "/tasks/bulk", json={"ids": [ids[0], ids[2], 999999]}, headers=headers)
+    assert response.status_code == 200
+    assert [r["ok"] for r in response.json()["results"]] == [True, True, False]
+    assert (await client.get(f"/tasks/{ids[0]}", headers=headers)).status_code == 404
+    assert (await client.get(f"/tasks/{ids[1]}", headers=headers)).status_code == 200
+
+@pytest.mark.asyncio
+async def test_update_rejects_null_for_required_fields(client):
+    email = "nulls@example.com"
+    password = "nullspassword"
+    await client.post("/users/", json={"email": email, "password": password})
+    headers = {"Authorization": f"Bearer {await get_token(client, email, password)}"}
+    task_id = (await client.post("/tasks/", json={"title": "Con título", "description": "x"}, headers=headers)).json()["id"]
+
+    for body in ({"title": None}, {"completed": None}):
+        response = await client.put(f"/tasks/{task_id}", json=body, headers=headers)
+        assert response.status_code == 422
+    response = await client.patch("/tasks/bulk", json={"items": [{"id": task_id, "title": None}]}, headers=headers)
+    assert response.status_code == 422
+
+    # description sí admite null
+    response = await client.put(f"/tasks/{task_id}", json={"description": None}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["title"] == "Con título" and response.json()["description"] is None
+
+@pytest.mark.asyncio
+async def test_bulk_rejects_empty_batch(client):
+    email = "bulkempty@example.com"
+    password = "bulkemptypassword"
+    await client.post("/users/", json={"email": email, "password": password})
+    headers = {"Authorization": f"Bearer {await get_token(client, email, password)}"}
+
+    assert (await client.post("/tasks/bulk", json={"items": []}, headers=headers)).status_code == 422
+    assert (await client.patch("/tasks/bulk", json={"items": []}, headers=headers)).status_code == 422
+    response = await client.request("DELETE", "/tasks/bulk", json={"ids": []}, headers=headers)
+    assert response.status_code == 422
+    assert (await client.get("/tasks/", headers=headers)).json() == []
+
+@pytest.mark.asyncio
+async def test_bulk_rejects_oversized_batch(client, monkeypatch):
+    from app.database import settings
+    monkeypatch.setattr(settings, "BULK_MAX_ITEMS", 2)
+    email = "bulkmax@example.com"
+    password = "bulkmaxpassword"
+    await client.post("/users/", json={"email": email, "password": password})
+    headers = {"Authorization": f"Bearer {await get_token(client, email, password)}"}
+
+    response = await client.post("/tasks/bulk", json={"items": [{"title": "x"}] * 3}, headers=headers)
+    assert response.status_code == 413
+
+@pytest.mark.asyncio
+async def test_cannot_modify_other_users_task(client):
+    for email in ("mine@example.com", "intruder@example.com"):
+        await client.post("/users/", json={"email": email, "password": "ownerpassword"})
+    owner = {"Authorization": f"Bearer {await get_token(client, 'mine@example.com', 'ownerpassword')}"}
+    intruder = {"Authorization": f"Bearer {await get_token(client, 'intruder@example.com', 'ownerpassword')}"}
+    task_id = (await client.post("/tasks/", json={"title": "Mía"}, headers=owner)).json()["id"]
+
+    assert (await client.get(f"/tasks/{task_id}", headers=intruder)).status_code == 404
+    assert (await client.put(f"/tasks/{task_id}", json={"title": "Robada"}, headers=intruder)).status_code == 404
+    assert (await client.delete(f"/tasks/{task_id}", headers=intruder)).status_code == 404
+    response = await client.get(f"/tasks/{task_id}", headers=owner)
+    assert response.json()["title"] == "Mía"
+
+@pytest.mark.asyncio
+async def test_conditional_get_task(client):
+    email = "etag@example.com"
+    password = "etagpassword"
+    await client.post("/users/", json={"email": email, "password": password})
+    headers = {"Authorization": f"Bearer {await get_token(client, email, password)}"}
+    task_id = (await client.post("/tasks/", json={"title": "Versionada"}, headers=headers)).json()["id"]
+
+    response = await client.get(f"/tasks/{task_id}", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["version"] == 1
+    etag = response.headers["etag"]
+    assert response.headers["cache-control"] == "private, no-cache"
+
+    response = await client.get(f"/tasks/{task_id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    updated = await client.put(f"/tasks/{task_id}", json={"completed": True}, headers=headers)
+    assert updated.json()["version"] == 2
+    assert updated.headers["etag"] != etag
+    response = await client.get(f"/tasks/{task_id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] == updated.headers["etag"]
+
+@pytest.mark.asyncio
+async def test_conditional_get_task_list(client):
+    email = "etaglist@example.com"
+    password = "etaglistpassword"
+    await client.post("/users/", json={"email": email, "password": password})
+    headers = {"Authorization": f"Bearer {await get_token(client, email, password)}"}
+    task_id = (await client.post("/tasks/", json={"title": "Primera"}, headers=headers)).json()["id"]
+
+    etag = (await client.get("/tasks/", headers=headers)).headers["etag"]
+    response = await client.get("/tasks/", headers={**headers, "If-None-Match": f'W/{etag}, "otro"'})
+    assert response.status_code == 304
+    # Otra página u otro modo de paginación es otra representación
+    response = await client.get("/tasks/", params={"cursor": ""}, headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+
+    # Altas, cambios y bajas invalidan el ETag del listado
+    for change in (
+        lambda: client.post("/tasks/", json={"title": "Segunda"}, headers=headers),
+        lambda: client.put(f"/tasks/{task_id}", json={"title": "Cambiada"}, headers=headers),
+        lambda: client.delete(f"/tasks/{task_id}", headers=headers),
+    ):
+        await change()
+        response = await client.get("/tasks/", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        etag = response.headers["etag"]
+
+@pytest.mark.asyncio
+async def test_search_tasks(client):
+    email = "search@example.com"
+    password = "searchpassword"
+    await client.post("/users/", json={"email": email, "password": password})
+    headers = {"Authorization": f"Bearer {await get_token(client, email, password)}"}
+    await client.post("/users/", json={"email": "search2@example.com", "password": password})
+    other = {"Authorization": f"Bearer {await get_token(client, 'search2@example.com', password)}"}
+    await client.post("/tasks/", json={"title": "Comprar leche", "description": "Leche de avena"}, headers=headers)
+    await client.post("/tasks/", json={"title": "Llamar al banco", "description": "Preguntar por la leche"}, headers=headers)
+    updated = (await client.post("/tasks/", json={"title": "Pagar la luz"}, headers=headers)).json()["id"]
+    await client.post("/tasks/", json={"title": "Leche ajena"}, headers=other)
+
+    response = await client.get("/tasks/search", params={"q": "leche"}, headers=headers)
+    assert response.status_code == 200
+    titles = [task["title"] for task in response.json()["items"]]
+    # La tarea con más apariciones primero; solo las del propietario
+    assert titles == ["Comprar leche", "Llamar al banco"]
+
+    # Prefijo en la última palabra y caracteres de sintaxis ignorados
+    response = await client.get("/tasks/search", params={"q": 'comprar "lec'}, headers=headers)
+    assert [task["title"] for task in response.json()["items"]] == ["Comprar leche"]
+
+    # Los triggers mantienen el índice al actualizar y borrar
+    await client.put(f"/tasks/{updated}", json={"title": "Pagar la leche"}, headers=headers)
+    seen, cursor = [], None
+    while True:
+        params = {"q": "leche", "limit": 1} | ({"cursor": cursor} if cursor else {})
+        page = (await client.get("/tasks/search", params=params, headers=headers)).json()
+        seen.extend(task["title"] for task in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert sorted(seen) == ["Comprar leche", "Llamar al banco", "Pagar la leche"]
+
+    await client.delete(f"/tasks/{updated}", headers=headers)
+    response = await client.get("/tasks/search", params={"q": "pagar"}, headers=headers)
+    assert response.json()["items"] == []
+
+    for limit in (0, -1):
+        response = await client.get("/tasks/search", params={"q": "leche", "limit": limit}, headers=headers)
+        assert response.status_code == 422
+    response = await client.get("/tasks/search", params={"q": "leche", "cursor": encode_cursor(1.0, 10**30)}, headers=headers)
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_filter_and_sort_tasks(client):
+    email = "filter@example.com"
+    password = "filterpassword"
+    await client.post("/users/", json={"email": email, "password": password})
+    headers = {"Authorization": f"Bearer {await get_token(client, email, password)}"}
+    ids = [(await client.post("/tasks/", json={"title": f"Filtro {i}", "completed": i % 2 == 0}, headers=headers)).json()["id"] for i in range(5)]
+    created = {task["id"]: task["created_at"] for task in (await client.get("/tasks/", headers=headers)).json()}
+
+    response = await client.get("/tasks/", params={"completed": "false", "order": "desc"}, headers=headers)
+    assert [task["id"] for task in response.json()] == [ids[3], ids[1]]
+
+    response = await client.get("/tasks/", params={"completed": "true", "cursor": "", "order": "asc", "limit": 2}, headers=headers)
+    page = response.json()
+    assert [task["id"] for task in page["items"]] == [ids[0], ids[2]]
+    response = await client.get("/tasks/", params={"completed": "true", "cursor": page["next_cursor"], "order": "asc", "limit": 2}, headers=headers)
+    assert [task["id"] for task in response.json()["items"]] == [ids[4]]
+
+    response = await client.get(
+        "/tasks/", params={"created_after": created[ids[1]], "created_before": created[ids[4]]}, headers=headers
+    )
+    assert [task["id"] for task in response.json()] == ids[1:4]
+
+    response = await client.get("/tasks/", params={"order": "random"}, headers=headers)
+    assert response.status_code == 422
+
+async def query_plan(db_session, stmt) -> str:
+    compiled = stmt.compile(dialect=db_session.bind.dialect)
+    params = tuple(compiled.construct_params()[name] for name in compiled.positiontup)
+    connection = await db_session.connection()
+    result = await connection.exec_driver_sql("EXPLAIN QUERY PLAN " + str(compiled), params)
+    return " | ".join(row[-1] for row in result.all())
+
+@pytest.mark.asyncio
+async def test_common_task_filters_use_an_index(db_session):
+    from datetime import datetime, timezone
+    from sqlalchemy import text
+    from app import crud, models, schemas
+    # Con estadísticas (ANALYZE) el planificador ve que las pendientes son pocas
+    user = models.User(email="plan@example.com", hashed_password="x")
+    db_session.add(user)
+    await db_session.flush()
+    await db_session.execute(
+        models.Task.__table__.insert(),
+        [{"title": f"Plan {i}", "completed": i % 20 != 0, "owner_id": user.id} for i in range(400)],
+    )
+    await db_session.commit()
+    await db_session.execute(text("ANALYZE"))
+    since = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    cases = {
+        "ix_tasks_owner_pending": crud.tasks_page_query(1, filters=schemas.TaskFilter(completed=False)),
+        "ix_tasks_owner_created_id": crud.tasks_page_query(1, cursor=None, filters=schemas.TaskFilter(order="asc", created_after=since)),
+    }
+    for index, stmt in cases.items():
+        plan = await query_plan(db_session, stmt)
+        assert index in plan, plan
+        assert "SCAN tasks" not in plan and "TEMP B-TREE" not in plan, plan
+
+    for stmt in (
+        crud.tasks_query(1, filters=schemas.TaskFilter(completed=True, order="desc")),
+        crud.tasks_page_query(1, filters=schemas.TaskFilter(created_before=since)),
+        crud.tasks_page_query(1, filters=schemas.TaskFilter(completed=False, created_after=since, order="asc")),
+    ):
+        plan = await query_plan(db_session, stmt)
+        assert "USING INDEX" in plan and "SCAN tasks" not in plan, plan
+
+@pytest.mark.asyncio
+async def test_task_stats(client, db_session):
+    from datetime import datetime, timezone
+    from app import models
+    email = "stats@example.com"
+    password = "statspassword"
+    await client.post("/users/", json={"email": email, "password": password})
+    headers = {"Authorization": f"Bearer {await get_token(client, email, password)}"}
+
+    response = await client.get("/tasks/stats", headers=headers)
+    assert response.json() == {"total": 0, "completed": 0, "pending": 0, "by_day": None}
+
+    ids = [(await client.post("/tasks/", json={"title": f"Stats {i}"}, headers=headers)).json()["id"] for i in range(4)]
+    await client.put(f"/tasks/{ids[0]}", json={"completed": True}, headers=headers)
+    await client.patch("/tasks/bulk", json={"items": [{"id": ids[1], "completed": True}, {"id": ids[2], "title": "Sin cambio de estado"}]}, headers=headers)
+    await client.delete(f"/tasks/{ids[3]}", headers=headers)
+    await client.request("DELETE", "/tasks/bulk", json={"ids": [ids[1]]}, headers=headers)
+
+    response = await client.get("/tasks/stats", params={"by_day": "true"}, headers=headers)
+    stats = response.json()
+    today = datetime.now(timezone.utc).date().isoformat()
+    assert stats == {"total": 2, "completed": 1, "pending": 1, "by_day": [{"day": today, "total": 2, "completed": 1}]}
+    for days in (0, -1, 10**9):
+        response = await client.get("/tasks/stats", params={"by_day": "true", "days": days}, headers=headers)
+        assert response.status_code == 422
+
+    # Los contadores coinciden con un agregado sobre las filas
+    owner_id = (await client.get(f"/tasks/{ids[0]}", headers=headers)).json()["owner_id"]
+    counter = await db_session.get(models.TaskCounter, owner_id)
+    assert (counter.total, counter.completed) == (2, 1)
+
+@pytest.mark.asyncio
+async def test_reads_use_replica_except_right_after_own_writes(client, tmp_path, monkeypatch):
+    from app import database
+    # Réplica vacía: permite distinguir qué lecturas llegan a ella
+    replica = database.create_engine_from_url(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+    async with replica.begin() as conn:
+        await conn.run_sync(database.Base.metadata.create_all)
+    monkeypatch.setattr(database.replicas, "replicas", [replica])
+    try:
+        email = "replica@example.com"
+        password = "replicapassword"
+        await client.post("/users/", json={"email": email, "password": password})
+        # El usuario aún no está en la réplica: la autenticación lo busca en el primario
+        headers = {"Authorization": f"Bearer {await get_token(client, email, password)}"}
+        assert (await client.post("/tasks/", json={"title": "Recién creada"}, headers=headers)).status_code == 200
+
+        # Tras su escritura, sus lecturas van al primario
+        assert (await client.get("/tasks/stats", headers=headers)).json()["total"] == 1
+        user_id = (await client.get("/tasks/", headers=headers)).json()[0]["owner_id"]
+        assert database.replicas.is_pinned(user_id)
+
+        # Pasada la ventana se lee de la réplica (que aún no tiene la tarea)
+        database.replicas._pinned.clear()
+        reads = database.replicas.reads
+        assert (await client.get("/tasks/stats", headers=headers)).json()["total"] == 0
+        assert database.replicas.reads == reads + 1
+    finally:
+        await replica.dispose()
@@ -26,3 +26,48 @@ async def test_create_user_duplicate_email(client):
     )
     assert response.status_code == 400
     assert response.json()["detail"] == "El email ya está registrado"
+
+@pytest.mark.asyncio
+async def test_auth_memory_is_flat_for_heavy_user(client, heavy_user):
+    import tracemalloc
+    from app.cache import token_cache
+
+    async def peak_for(email, password):
+        response = await client.post("/token", data={"username": email, "password": password})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        task_id = (await client.post("/tasks/", json={"title": "Medir"}, headers=headers)).json()["id"]
+        # Sin caché de tokens para forzar la carga del usuario en cada petición
+        token_cache.clear()
+        tracemalloc.start()
+        response = await client.put(f"/tasks/{task_id}", json={"completed": True}, headers=headers)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert response.status_code == 200
+        return peak
+
+    await client.post("/users/", json={"email": "light@example.com", "password": "lightpassword"})
+    light_peak = await peak_for("light@example.com", "lightpassword")
+    heavy_peak = await peak_for(*heavy_user)
+    # Con 5000 tareas cargadas en memoria el pico sería varios MB mayor
+    assert heavy_peak < light_peak * 1.5 + 256 * 1024
+
+@pytest.mark.asyncio
+async def test_write_requests_commit_once(client, db_session):
+    from sqlalchemy import event
+    commits = []
+
+    def count_commit(connection):
+        commits.append(connection)
+
+    event.listen(db_session.bind.sync_engine, "commit", count_commit)
+    try:
+        response = await client.post("/users/", json={"email": "uow@example.com", "password": "uowpassword"})
+        assert response.status_code == 200
+        assert len(commits) == 1
+
+        # El email duplicado lo detecta la restricción UNIQUE (SAVEPOINT) y no se confirma nada
+        response = await client.post("/users/", json={"email": "uow@example.com", "password": "otherpassword"})
+        assert response.status_code == 400
+        assert len(commits) == 1
+    finally:
+        event.remove(db_session.bind.sync_engine, "commit", count_commit)